@@ -1,6 +1,23 @@
-from .main import run as backup
-from .logreader import logreader
-from .receiver import receiver
+import importlib
+
 from .version import __version__, __version_tuple__
 
-__all__ = ["backup", "logreader", "receiver"]
+# entry points are imported when they are used, so that each one only loads
+# what it needs. receiver and logreader first try to hand their request to a
+# running sayod-daemon.
+_entry_points = {
+    'backup': ('.main', 'run'),
+    'logreader': ('.daemonclient', 'logreader'),
+    'receiver': ('.daemonclient', 'receiver'),
+}
+
+
+def __getattr__(name):
+    if name not in _entry_points:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = _entry_points[name]
+    return getattr(importlib.import_module(module, __name__), attr)
+
+
+# the entry points are provided by __getattr__ above, which pylint cannot see:
+__all__ = ["backup", "logreader", "receiver"]  # pylint: disable=undefined-all-variable
@@ -1,32 +1,126 @@
 import datetime
+import json
 import logging
+import os
+from pathlib import Path
 
 from .config import Config
 from .mailer import Mailer
-from .taggedentry import TaggedEntry
-from .taggedlog import TaggedLog
+from .status import status_log
+from .taggedentry import LazyEntry, TaggedEntry
 from .version import __version__
 
 alog = logging.getLogger(__name__)
 
 
+class _Checkpoint:
+    """Remembers how far the status log has been analysed and the state up to
+    there, so that the next analysis only needs to read what was appended since."""
+    suffix = '.analysed'
+
+    def __init__(self, log_file):
+        self.path = Path(str(log_file) + _Checkpoint.suffix)
+        self.inode = None
+        self.offset = 0
+        self.success = None
+        self.start = None
+        # a checkpoint is only saved once what has been found was reported:
+        self.reported = True
+        try:
+            with self.path.open(encoding='utf-8') as cp:
+                data = json.load(cp)
+            self.inode = data['inode']
+            self.offset = data['offset']
+            self.success = data['success']
+            self.start = data['start']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            alog.warning("Ignoring unusable checkpoint %s: %s", self.path, e)
+            self.inode = None
+
+    def valid_for(self, inode, end):
+        """A rotated or truncated log cannot be continued."""
+        return self.inode == inode and self.offset <= end
+
+    def entry(self, name):
+        line = getattr(self, name)
+        return LazyEntry(line) if line else None
+
+    def advance(self, inode, end, found):
+        """Moves the checkpoint to the offset end of the log with inode, where the
+        entries in found are the last success and start."""
+        self.inode = inode
+        self.offset = end
+        self.success = str(found['success']) if found['success'] else None
+        self.start = str(found['start']) if found['start'] else None
+
+    def save(self):
+        # if the mail could not be sent or logged, the next analysis has to report again.
+        if not self.reported:
+            return
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with tmp.open('w', encoding='utf-8') as cp:
+                json.dump({'inode': self.inode,
+                           'offset': self.offset,
+                           'success': self.success,
+                           'start': self.start,
+                           }, cp)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            alog.warning("Cannot store checkpoint %s: %s", self.path, e)
+
+
 class _Analyse:
+    # subjects which are not reported as errors
+    no_errors = ['ABORT', 'ANALYSE', 'DEADTIME', 'MAIL', 'START', 'SUCCESS']
+
     def __init__(self):
         self.error_log = {
             'NOTIFY': [],
             'WARN': [],
             'ERR': []
         }
-        self.content_headlines = {cat: Config.get().find('category_headlines', cat, cat)
-                                  for cat in self.error_log}
-        self.log_obj = TaggedLog(Config.get().find('status', 'file', ''), 'r')
+        self.log_obj = status_log('r')
         self.warn_missing_success = Config.get().find("status", "warn_missing", 9)
         self.now = datetime.datetime.now()
-        self.warn_missing_since = self.now - datetime.timedelta(days=int(self.warn_missing_success))
         self.text = ""
+        self.found = {}
+        self.checkpoint = _Checkpoint(self.log_obj.log_file)
+
+    def query(self):
+        inode, end = self.log_obj.position()
+        # everything before the checkpoint has been analysed (and reported) before.
+        bounds = {'start_offset': 0, 'end_offset': end}
+        previous = {'success': None, 'start': None}
+        if self.checkpoint.valid_for(inode, end):
+            bounds['start_offset'] = self.checkpoint.offset
+            previous = {name: self.checkpoint.entry(name) for name in previous}
+            alog.info("Analysing from offset %d on", self.checkpoint.offset)
+        else:
+            alog.info("Analysing the whole log")
+        # everything that is needed from the log is found in one go:
+        found = self.log_obj.find_batch({
+            'success': {'subject': 'SUCCESS', 'action': 'last', **bounds},
+            'start': {'subject': 'START', 'action': 'last', 'after': 'success', **bounds},
+            'analysis': {'subjects': ['ANALYSE', 'MAIL'], 'action': 'last', **bounds},
+            'errors': {'exclude': _Analyse.no_errors, 'action': 'list', 'after': 'analysis',
+                       **bounds},
+        })
+        self.found = {
+            'success': found['success'][0],
+            'start': found['start'][0],
+            'errors': found['errors'],
+        }
+        if self.found['success'] is None:
+            self.found['success'] = previous['success']
+            if self.found['start'] is None:
+                self.found['start'] = previous['start']
+        self.checkpoint.advance(inode, end, self.found)
 
     def find_last_success(self):
-        last_success = self.log_obj.find_one(subject="SUCCESS", action='last')
+        last_success = self.found['success']
         if not last_success:
             last_success = TaggedEntry(
                 "Es wurde noch nie ein erfolgreiches Backup gemacht",
@@ -34,7 +128,7 @@ class _Analyse:
             )
             alog.info(last_success.content)
             return
-        if last_success.date >= self.warn_missing_since:
+        if last_success.date >= self.now - datetime.timedelta(days=int(self.warn_missing_success)):
             return
         msg = Config.get().find("messages", "warn_missing",
                                 "Last successful backup was at {last_success.date:%Y.%m.%d %H:%M}."
@@ -42,11 +136,11 @@ class _Analyse:
                                     days=self.warn_missing_success,
                                     last_success=last_success
                                 )
-        last_start = self.log_obj.find_one(subject="START", since=last_success.date, action='last')
+        last_start = self.found['start']
         if last_start:
             msg += "\n\n"
             msg += Config.get().find("messages", "report_last_started",
-                                     "Last backup was at {last_start[0].date:%Y.%m.%d %H:%M}"
+                                     "Last backup was at {last_start.date:%Y.%m.%d %H:%M}"
                                      ).format(
                                          last_start=last_start,
                                          diff=(self.now - last_start.date)
@@ -61,23 +155,7 @@ class _Analyse:
         alog.warning(last_success.content)
 
     def find_new_errors(self):
-        last_analysis = self.log_obj.find_one(subjects=["ANALYSE", "MAIL"], action='last')
-        if not last_analysis:
-            last_date = datetime.datetime.min
-        else:
-            last_date = last_analysis.date
-
-        for entry in self.log_obj.find(since=last_date, action='list'):
-            if entry.subject in (
-                'ABORT',
-                'ANALYSE',
-                'DEADTIME',
-                'MAIL',
-                'START',
-                'SUCCESS'
-                    ):
-                continue
-            self.error_log['ERR'].append(entry)
+        self.error_log['ERR'].extend(self.found['errors'])
 
     @property
     def number_of_messages(self):
@@ -90,6 +168,8 @@ class _Analyse:
     def compose_mail(self):
         if not self.has_something_to_report:
             return
+        headlines = {cat: Config.get().find('category_headlines', cat, cat)
+                     for cat in self.error_log}
         self.text = Config.get().find('messages', 'opening', "Hallo")
         self.text += "\n"
         self.text += Config.get().find("messages", "analyse_headline",
@@ -102,7 +182,7 @@ class _Analyse:
         for cat, content in self.error_log.items():
             if len(content) == 0:
                 continue
-            self.text += f" - {len(content)} {self.content_headlines[cat]}\n"
+            self.text += f" - {len(content)} {headlines[cat]}\n"
 
         self.text += "\n"
 
@@ -110,7 +190,7 @@ class _Analyse:
             if len(self.error_log[cat]) == 0:
                 continue
 
-            self.text += f"###### {self.content_headlines[cat]:s} #####\n"
+            self.text += f"###### {headlines[cat]:s} #####\n"
             for ele in self.error_log[cat]:
                 self.text += ele.long_text(prefix='* ')
 
@@ -128,7 +208,7 @@ class _Analyse:
             return
         can_log = True
         try:
-            write_log = TaggedLog(self.log_obj.log_file, 'a+')
+            write_log = status_log('a+')
         except PermissionError as pe:
             alog.error("Cannot append to log file: %s", pe)
             self.text += "\n\nThe fact that this mail has been written could not be stored."
@@ -140,20 +220,25 @@ class _Analyse:
 
         if can_log:
             write_log.append(entry)
+        self.checkpoint.reported = can_log and entry.subject == 'MAIL'
+
+    def save_checkpoint(self):
+        self.checkpoint.save()
 
 
 class Analyse:
     prog = 'analyse'
 
     @classmethod
-    def add_subparser(cls, sp):
-        return sp.add_parser(cls.prog,
-                             help='Analyses log entries and reports via mail')
+    def add_subparser(cls, sp, helptext):
+        return sp.add_parser(cls.prog, help=helptext)
 
     @classmethod
     def standalone(cls, **_):
         a = _Analyse()
+        a.query()
         a.find_last_success()
         a.find_new_errors()
         a.compose_mail()
         a.send_mail()
+        a.save_checkpoint()
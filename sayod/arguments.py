@@ -1,19 +1,9 @@
 import argparse
+import importlib
 
-from .analyse import Analyse
-from .copy import Copy
 from .config import Config
-from .database import Database
-from .grand_commit import GrandCommit
 from .log import Log
 from .notify import Notify
-from .logreader import LogReader
-from .receiver import Receiver
-from .remotereader import RemoteReader
-from .replacegit import ReplaceGit
-from .small_commit import SmallCommit
-from .squasher import Squasher
-from .zippedgit import ZippedGit
 from .version import __version__
 
 
@@ -22,15 +12,53 @@ class SayodCommandNotFound(ValueError):
 
 
 class Arguments:
-    _klasses = (Analyse, Copy, Config, Database, GrandCommit, Notify, LogReader, Receiver,
-                RemoteReader, ReplaceGit, SmallCommit, Squasher, ZippedGit)
-    # classes whose standalone can only be called directly:
-    _single_klasses = (Config, Notify, LogReader, Receiver, RemoteReader, Squasher)
-    # classes whose standalone can be called as context action:
-    _combine_klasses = (Analyse, Copy, Database, GrandCommit, ReplaceGit, SmallCommit, ZippedGit)
+    # subcommand -> (module, class, help, whether it can be called as context action).
+    # Modules are only imported when their subcommand is used; the help is given
+    # to the add_subparser of the class.
+    _commands = {
+        'config': ('.config', 'Config',
+                   'Extracts actual, interpolated configuration options', False),
+        'import-log': ('.importlog', 'ImportLog',
+                       'Imports a text status log into the status database', False),
+        'notify': ('.notify', 'Notify',
+                   'Creates notifications, both to the user and to the remote log.', False),
+        'logreader': ('.logreader', 'LogReader', 'Serves excerpts from the remote log.', False),
+        'receive': ('.receiver', 'Receiver', 'Receives new entries for the remote log.', False),
+        'remotereader': ('.remotereader', 'RemoteReader', 'Reads contents from the remote log.',
+                         False),
+        'squasher': ('.squasher', 'Squasher',
+                     'Integrates commits from a given time period into one commit, rebasing '
+                     'newer commits onto them.', False),
+        'analyse': ('.analyse', 'Analyse', 'Analyses log entries and reports via mail', True),
+        'copy': ('.copy', 'Copy', 'Copies files and directories using rsync.', True),
+        'database': ('.database', 'Database',
+                     'Dumps the tables of a database and makes a small commit', True),
+        'grandcommit': ('.grand_commit', 'GrandCommit',
+                        'Integrates the last commits in a repository into one commit only.',
+                        True),
+        'replace-git': ('.replacegit', 'ReplaceGit',
+                        'Creates a commit from all files in a git working directory.', True),
+        'smallcommit': ('.small_commit', 'SmallCommit', 'Creates a small commit', True),
+        'zipped-git': ('.zippedgit', 'ZippedGit',
+                       'Extracts the content of an archive file into a git repository and adds '
+                       'them.', True),
+    }
+    _klasses = {}
 
-    command_dict = {}
-    combine_dict = {}
+    @classmethod
+    def klass(cls, name):
+        """The class of subcommand name, or None if there is no such subcommand."""
+        if name not in cls._commands:
+            return None
+        if name not in cls._klasses:
+            module, klass, _, _ = cls._commands[name]
+            cls._klasses[name] = getattr(importlib.import_module(module, __package__), klass)
+        return cls._klasses[name]
+
+    @classmethod
+    def combinable(cls, name):
+        """Whether subcommand name can be called as context action."""
+        return name in cls._commands and cls._commands[name][3]
 
     @classmethod
     def add_context_options(cls, parser):
@@ -42,22 +70,29 @@ class Arguments:
                             help="Ignore deadtime and force action",
                             dest="context_force")
 
+    @classmethod
+    def _parser(cls, selected=None):
+        """Parser for all options; only the subcommand selected gets its own
+        options, the others are only listed."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
+        Log.add_options(parser)
+        Config.add_options(parser)
+        Notify.add_options(parser)
+        cls.add_context_options(parser)
+        sp = parser.add_subparsers(help="""Different sayod tasks are available:""",
+                                   dest="subcommand")
+        for name, (_, _, helptext, _) in cls._commands.items():
+            if name == selected:
+                cls.klass(name).add_subparser(sp, helptext)
+            else:
+                sp.add_parser(name, help=helptext, add_help=selected is not None)
+        return parser
+
     def __init__(self):
-        self.parser = argparse.ArgumentParser()
-        self.parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
-        Log.add_options(self.parser)
-        Config.add_options(self.parser)
-        Notify.add_options(self.parser)
-        self.add_context_options(self.parser)
-        sp = self.parser.add_subparsers(help="""Different sayod tasks are available:""",
-                                        dest="subcommand")
-        for klass in Arguments._single_klasses:
-            klass.add_subparser(sp)
-            Arguments.command_dict[klass.prog] = klass
-        for klass in Arguments._combine_klasses:
-            klass.add_subparser(sp)
-            Arguments.command_dict[klass.prog] = klass
-            Arguments.combine_dict[klass.prog] = klass
+        # find out which subcommand is used before its module is imported:
+        selected, _ = self._parser().parse_known_args()
+        self.parser = self._parser(selected.subcommand)
         self.args = None
 
     def get_arguments(self):
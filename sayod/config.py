@@ -14,11 +14,39 @@ class _Config:
     def basedir(cls):
         return Path.home() / '.config' / 'sayod'
 
-    def __init__(self, filename):
+    @classmethod
+    def statedir(cls):
+        return Path(os.environ.get('XDG_STATE_HOME', Path.home() / '.local' / 'state')) / 'sayod'
+
+    @classmethod
+    def cachedir(cls):
+        return Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'sayod'
+
+    # configurations that have been read by this process, by absolute filename
+    _known = {}
+
+    @classmethod
+    def _path(cls, filename):
         if isinstance(filename, str):
             filename = Path(filename)
         if not filename.is_absolute():
             filename = _Config.basedir() / filename
+        return filename
+
+    @classmethod
+    def load(cls, filename, environ=None):
+        """The configuration from filename; it is only parsed again if one of
+        its files or the environment (os.environ unless given) has changed."""
+        filename = cls._path(filename)
+        config = cls._known.get(str(filename))
+        if config is not None and config.unchanged(environ):
+            return config
+        config = _Config(filename, environ)
+        cls._known[str(filename)] = config
+        return config
+
+    def __init__(self, filename, environ=None):
+        filename = self._path(filename)
         ini_obj = configparser.ConfigParser(
             interpolation=configparser.ExtendedInterpolation()
         )
@@ -28,12 +56,18 @@ class _Config:
             str(filename.with_suffix(".rc")),
             str(filename.with_suffix(".ini"))
         )
-        ini_obj.read(variants)
+        # the raw contents of each file (None if it does not exist) and its
+        # mtime and size, by path, so that changes can be noticed:
+        self.layers = {}
+        self.stamps = {}
+        self.environ = dict(os.environ if environ is None else environ)
+        # all files that have been read:
+        self.files = self._read(ini_obj, variants)
         if len(ini_obj.sections()) == 0:
             raise FileNotFoundError(errno.ENOENT, "Configuration file not found", str(filename))
         # add environment variables to [env]; this allows to use them in
         # interpolation directives.
-        env = {x: y.replace("$", "＄") for x, y in os.environ.items()}
+        env = {x: y.replace("$", "＄") for x, y in self.environ.items()}
         ini_obj.read_dict({'env': env,
                            'info': {'stripped_name': filename.stem}
                            })
@@ -44,13 +78,52 @@ class _Config:
                 path = Path(def_file)
                 if def_file[0] != '/':
                     path = filename.parents[0] / def_file
-                if len(ini_obj.read(str(path))) == 0:
+                read = self._read(ini_obj, [str(path)])
+                if len(read) == 0:
                     raise FileNotFoundError(errno.ENOENT,
                                             f"defaults file {tag} not found", def_file)
+                self.files += read
         # re-read original file to override defaults:
-        ini_obj.read(variants)
+        self._read(ini_obj, variants)
         self.configuration = ini_obj
 
+    @classmethod
+    def _parse(cls, path):
+        """Contents of the file at path without interpolation, or None."""
+        # DEFAULT is kept as a section of its own so that its values are not
+        # copied into every other section:
+        raw = configparser.RawConfigParser(default_section='\0')
+        if not raw.read(path):
+            return None
+        return {section: dict(raw.items(section)) for section in raw.sections()}
+
+    def _read(self, ini_obj, paths):
+        """Reads the existing files among paths into ini_obj, just like
+        ini_obj.read(paths), and returns their paths."""
+        read = []
+        for path in paths:
+            if path not in self.layers:
+                self.stamps[path] = self._stamp(path)
+                self.layers[path] = self._parse(path)
+            if self.layers[path] is not None:
+                ini_obj.read_dict(self.layers[path], source=path)
+                read.append(path)
+        return read
+
+    @classmethod
+    def _stamp(cls, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def unchanged(self, environ=None):
+        """True if reading the configuration again would give the same result."""
+        if self.environ != dict(os.environ if environ is None else environ):
+            return False
+        return all(self._stamp(path) == stamp for path, stamp in self.stamps.items())
+
     @property
     def friendly(self):
         return self.find('info', 'friendly_name',
@@ -88,8 +161,8 @@ class Config:
                            required=True)
 
     @classmethod
-    def add_subparser(cls, sp):
-        ap = sp.add_parser(cls.prog, help='Extracts actual, interpolated configuration options')
+    def add_subparser(cls, sp, helptext):
+        ap = sp.add_parser(cls.prog, help=helptext)
         ap.add_argument('--section', required=True, help='Configuration file section')
         ap.add_argument('--key', required=True, help='Configuration section key')
         ap.add_argument('--default', required=False, default=None,
@@ -98,7 +171,8 @@ class Config:
 
     @classmethod
     def init(cls, **kwargs):
-        cls._instance = _Config(kwargs.get('configuration_file', ''))
+        cls._instance = _Config.load(kwargs.get('configuration_file', ''),
+                                     kwargs.get('environ', None))
 
     @classmethod
     def get(cls):
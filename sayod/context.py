@@ -6,19 +6,56 @@ from .config import Config
 from .notify import Notify
 from .plain_log import PlainLog
 from .provider import ProviderFactory, ProvideError
-from .remotereader import remote
+from .remotereader import BatchUnsupported, remote, remote_batch, use_batch
+from .successcache import SuccessCache
 
 clog = logging.getLogger(__name__)
 
 
 class Context:
+    @classmethod
+    def ask_remote(cls):
+        """The last SUCCESS, the last START after it and the number of DEADTIMEs
+        after it, asked in one session. Hosts which do not understand batches
+        are only asked for the last SUCCESS; the others are None then."""
+        if use_batch():
+            try:
+                answers = remote_batch({
+                    'success': {'subjects': ['SUCCESS'], 'action': PlainLog.LAST},
+                    'start': {'subjects': ['START'], 'action': PlainLog.LAST,
+                              'after': 'success'},
+                    'deadtime': {'subjects': ['DEADTIME'], 'action': PlainLog.COUNT,
+                                 'after': 'success'},
+                    })
+                if not answers['success']:
+                    raise ValueError("No results received")
+                start = answers['start'][0] if answers['start'] else None
+                return answers['success'][0], start, answers['deadtime'][0]
+            except BatchUnsupported:
+                clog.warning("Host does not understand batches, set [notify] ask = plain")
+        return remote(['SUCCESS'], PlainLog.LAST), None, None
+
     @classmethod
     def test_deadtime(cls, **kwargs):
         deadtime = int(Config.get().find('rsync', 'deadtime', 0))
         if deadtime <= 0:
             clog.debug("No deadtime given, going ahead")
             return True
-        last_success = remote(['SUCCESS'], PlainLog.LAST).date
+        # a cached success only tells that the deadtime is not over yet:
+        last_success = SuccessCache.load()
+        if last_success is None or (datetime.datetime.today() - last_success).days > deadtime:
+            # a success that could not be sent before must be seen by the remote log:
+            if Notify.get().ssh['pipe'] and Notify.get().outbox:
+                Notify.get().flush_outbox()
+            success, start, skipped = cls.ask_remote()
+            last_success = success.date
+            SuccessCache.store(last_success)
+            if start is not None:
+                clog.warning("Backup started %s has not succeeded", start.date)
+            if skipped:
+                clog.info("%d runs have been skipped since the last success", skipped)
+        else:
+            clog.debug("Using cached last success")
         clog.debug("Last success was %s", last_success)
         tage = (datetime.datetime.today() - last_success).days
         if tage > deadtime:
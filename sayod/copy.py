@@ -2,7 +2,7 @@ import logging
 
 from .config import Config
 from .notify import Notify
-from .rsync import RSync
+from .rsync import ParallelRSync, RSync
 
 clog = logging.getLogger(__name__)
 
@@ -41,7 +41,12 @@ def do_copy():
     clog.info("Sources %s", '; '.join(sources))
     clog.info("Target %s", target)
 
-    rsync = RSync()
+    parallel = int(Config.get().find('rsync', 'parallel', 1))
+    shards = int(Config.get().find('rsync', 'shards', 1))
+    if parallel > 1 or shards > 1:
+        rsync = ParallelRSync(parallel if parallel > 1 else shards, shards)
+    else:
+        rsync = RSync()
     rsync.run(sources=sources, target=target)
     rsync.wrapup()
 
@@ -50,10 +55,8 @@ class Copy:
     prog = 'copy'
 
     @classmethod
-    def add_subparser(cls, sp):
-        return sp.add_parser(cls.prog,
-                             help="Copies files and directories using rsync."
-                             )
+    def add_subparser(cls, sp, helptext):
+        return sp.add_parser(cls.prog, help=helptext)
 
     @classmethod
     def standalone(cls, **_):
@@ -0,0 +1,131 @@
+"""Serves receiver and logreader requests from one long running process.
+
+Every request over ssh otherwise starts Python, imports sayod, reads the
+configuration and opens the status log again. The daemon listens on a Unix
+socket (see daemonclient.socket_path) and keeps configurations and status
+logs open between requests; the receiver and logreader commands hand their
+requests to it if it is running. Each connection is read and answered by a
+thread of its own, so that a slow client does not hold up the others; the
+requests themselves are executed one after the other, as they share the
+configuration and the open logs."""
+
+import io
+import json
+import logging
+import os
+import signal
+import socketserver
+import threading
+
+from .config import Config
+from .daemonclient import TRAILER, socket_path
+from .log import Log
+from .logreader import LogReader
+from .plain_log import PlainLog
+from .receiver import Receiver
+from .status import keep_logs_open
+from .version import __version__
+
+dlog = logging.getLogger(__name__)
+
+
+def oneline_error(e):
+    return f"{type(e).__name__}: {e}".replace('\n', ' ')
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # seconds a client may stay silent while sending its request or taking the
+    # answer:
+    timeout = 60
+    executing = threading.Lock()
+
+    def handle(self):
+        # the answer is sent while it is written:
+        stdout = io.TextIOWrapper(self.wfile, encoding='utf-8')
+        try:
+            stdin = io.StringIO(self.rfile.read().decode('utf-8'))
+            with self.executing:
+                code, message = self.execute(stdin, stdout)
+        except (OSError, ValueError) as e:
+            dlog.warning("Cannot read request: %s", e)
+            code, message = 1, oneline_error(e)
+        try:
+            stdout.write(f"{TRAILER.decode('ascii')}{code} {message}\n")
+            stdout.flush()
+        except OSError as e:
+            dlog.warning("Cannot answer request: %s", e)
+
+    @classmethod
+    def read_command(cls, stdin):
+        """The command and the environment of the client; None if the client
+        has not sent it."""
+        command = stdin.readline().strip()
+        start = stdin.tell()
+        line = stdin.readline()
+        if line.startswith('env '):
+            return command, json.loads(line[len('env '):])
+        stdin.seek(start)
+        return command, None
+
+    @classmethod
+    def execute(cls, stdin, stdout):
+        """Executes the request on stdin, returns exit code and message."""
+        code, message = 0, ''
+        try:
+            command, environ = cls.read_command(stdin)
+            default = 'text/x-plain-log' if command == 'receiver' else 'text/x-plain-ask'
+            content_type, line = PlainLog.read_header(stdin, default)
+            dlog.info("%s request (%s) for %s", command, content_type, line)
+            Config.init(configuration_file=line, environ=environ)
+            if command == 'receiver':
+                Receiver.serve(stdin, content_type)
+            elif command == 'logreader':
+                LogReader.serve(stdin, stdout, content_type)
+            else:
+                raise ValueError(f"Unknown command {command}")
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+            message = f"Request ended with {e.code}"
+        # whatever fails, the client is told and the daemon goes on:
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            dlog.exception("Request failed")
+            code, message = 1, oneline_error(e)
+        return code, message
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # requests which are running are finished before the daemon stops:
+    block_on_close = True
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _terminate(*_):
+    raise SystemExit(0)
+
+
+# entry point for 'sayod-daemon' command as created by installing the wheel
+def daemon():
+    Log.init_root()
+    signal.signal(signal.SIGTERM, _terminate)
+    dlog.info("Starting daemon (v%s)", __version__)
+    keep_logs_open()
+    path = socket_path()
+    _remove(path)
+    old_umask = os.umask(0o077)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        dlog.info("Stopping daemon")
+    finally:
+        server.server_close()
+        _remove(path)
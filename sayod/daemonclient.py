@@ -0,0 +1,73 @@
+"""Client side of the sayod daemon: hands the request on STDIN to the daemon
+and copies its answer to STDOUT. Only uses the standard library, so that it
+starts quickly."""
+
+import json
+import os
+import socket
+import sys
+
+# the daemon ends each answer with this, followed by the exit code and a
+# message for STDERR:
+TRAILER = b'\0exit '
+
+
+def socket_path():
+    # no pathlib, it takes longer to import than everything else here.
+    if 'SAYOD_SOCKET' in os.environ:
+        return os.environ['SAYOD_SOCKET']
+    runtime = os.environ.get('XDG_RUNTIME_DIR', f'/run/user/{os.getuid()}')
+    return os.path.join(runtime, 'sayod.sock')
+
+
+def forward(command):
+    """Lets a running daemon execute command ('receiver' or 'logreader') on
+    STDIN. Returns False if there is no daemon, so that the caller does the
+    work itself."""
+    path = socket_path()
+    if not os.path.exists(path):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return False
+    with sock:
+        # the configuration may refer to the environment of this process:
+        sock.sendall(f"{command}\nenv {json.dumps(dict(os.environ))}\n".encode('utf-8'))
+        while True:
+            chunk = sys.stdin.buffer.read(1 << 16)
+            if not chunk:
+                break
+            sock.sendall(chunk)
+        sock.shutdown(socket.SHUT_WR)
+        code = 1
+        message = b'Connection to sayod daemon lost'
+        for line in sock.makefile('rb'):
+            if line.startswith(TRAILER):
+                code, _, message = line[len(TRAILER):].rstrip(b'\n').partition(b' ')
+                code = int(code)
+                break
+            sys.stdout.buffer.write(line)
+        sys.stdout.buffer.flush()
+    if code != 0:
+        sys.stderr.write(message.decode('utf-8', 'replace') + "\n")
+        raise SystemExit(code)
+    return True
+
+
+# entry points for 'receiver' and 'logreader' commands as created by installing the wheel:
+# without a daemon, the request is handled in this process.
+def receiver():
+    if not forward('receiver'):
+        # pylint: disable=import-outside-toplevel
+        from .receiver import receiver as local_receiver
+        local_receiver()
+
+
+def logreader():
+    if not forward('logreader'):
+        # pylint: disable=import-outside-toplevel
+        from .logreader import logreader as local_logreader
+        local_logreader()
@@ -100,9 +100,8 @@ class Database:
     prog = 'database'
 
     @classmethod
-    def add_subparser(cls, sp):
-        return sp.add_parser(cls.prog,
-                             help="""Dumps the tables of a database and makes a small commit""")
+    def add_subparser(cls, sp, helptext):
+        return sp.add_parser(cls.prog, help=helptext)
 
     @classmethod
     def standalone(cls, **_):
@@ -22,10 +22,8 @@ class GrandCommit:
     prog = 'grandcommit'
 
     @classmethod
-    def add_subparser(cls, sp):
-        return sp.add_parser(cls.prog,
-                             help='''Integrates the last commits in a repository into one commit
-                                     only.''')
+    def add_subparser(cls, sp, helptext):
+        return sp.add_parser(cls.prog, help=helptext)
 
     @classmethod
     def standalone(cls, **_):
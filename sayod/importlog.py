@@ -0,0 +1,35 @@
+"""Copies a text status log into the configured SQLite status database."""
+
+import logging
+
+from .segments import Manifest
+from .sqlitelog import SqliteLog
+from .status import status_file, status_log
+from .taggedlog import TaggedLog
+
+illog = logging.getLogger(__name__)
+
+
+class ImportLog:
+    prog = 'import-log'
+    print_result = True
+
+    @classmethod
+    def add_subparser(cls, sp, helptext):
+        ap = sp.add_parser(cls.prog, help=helptext)
+        ap.add_argument('text_log', help='Text status log (rotated segments are included)')
+        return ap
+
+    @classmethod
+    def standalone(cls, **kwargs):
+        if kwargs['text_log'] == status_file():
+            illog.error("%s is the status database itself", kwargs['text_log'])
+            return False
+        source = TaggedLog(kwargs['text_log'], 'r', archive=Manifest(kwargs['text_log']))
+        target = status_log('a')
+        if not isinstance(target, SqliteLog):
+            illog.error("[status] backend is not sqlite, nothing to import into")
+            return False
+        count = target.append_many(source.find_iter())
+        illog.info("Imported %d entries from %s", count, kwargs['text_log'])
+        return f"{count} entries imported"
@@ -0,0 +1,104 @@
+"""Counts what rsync has done from its --itemize-changes and --stats output.
+
+An itemized line starts with YXcstpoguax, where Y is the kind of update
+('<', '>' transfer, 'c' local change, 'h' hard link, '.' attributes only,
+'*' message such as *deleting) and X the file type; an attribute string
+of '+' only means a new item. See rsync(1)."""
+
+import re
+
+# unchanged items (with -ii) have spaces instead of attributes:
+ITEM = re.compile(r'([<>ch.*])([fdLDS])(\S{9,}| {9,}) (.*)')
+# --stats lines whose value is kept, with the name it is kept under:
+STATS = {'Total file size': 'total',
+         'Total transferred file size': 'transferred',
+         'Total bytes sent': 'sent',
+         'Total bytes received': 'received',
+         }
+
+
+def parse_item(line):
+    """(kind, path) of an itemized line: kind is one of ItemizeStats.counters,
+    None for unchanged items, or the line is not itemized (None, None)."""
+    if line.startswith('*deleting '):
+        return 'deleted', line[10:].lstrip()
+    match = ITEM.fullmatch(line)
+    if match is None or match[1] == '*':
+        return None, None
+    update, kind, attributes, path = match.groups()
+    # symbolic and hard links are followed by their target:
+    if kind == 'L' or update == 'h':
+        path = re.split(' [-=]> ', path, maxsplit=1)[0]
+    if set(attributes) == {'+'}:
+        return 'created', path
+    if update in '<>ch':
+        return 'updated', path
+    if set(attributes) - {'.', ' '}:
+        return 'metadata', path
+    return None, path
+
+
+def unescape(path):
+    """rsync writes unprintable bytes of names as \\#ooo (octal). Bytes which
+    are not UTF-8 are kept as surrogates, see os.fsdecode."""
+    if '\\#' not in path:
+        return path
+    raw = re.sub(rb'\\#([0-7]{3})', lambda m: bytes([int(m[1], 8)]),
+                 path.encode('utf-8', 'surrogateescape'))
+    return raw.decode('utf-8', 'surrogateescape')
+
+
+def parse_number(text):
+    """Number from --stats, with or without thousands separators or a suffix
+    from --human-readable."""
+    text = text.strip()
+    if re.fullmatch(r'\d{1,3}([.,]\d{3})*', text):
+        return int(re.sub('[.,]', '', text))
+    factor = 1
+    if text and text[-1] in 'KMGT':
+        factor = 1000 ** ('KMGT'.index(text[-1]) + 1)
+        text = text[:-1]
+    return int(float(text.replace(',', '.')) * factor)
+
+
+class ItemizeStats:
+    counters = ('created', 'updated', 'deleted', 'metadata')
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.counters, 0)
+        self.bytes = {}
+        self.seconds = 0.0
+
+    def add(self, line):
+        """Counts line and returns what parse_item returns."""
+        kind, path = parse_item(line)
+        if kind is not None:
+            self.counts[kind] += 1
+            return kind, path
+        name, colon, value = line.partition(':')
+        if colon and name in STATS:
+            try:
+                self.bytes[STATS[name]] = parse_number(value.split()[0])
+            except (ValueError, IndexError):
+                pass
+        return kind, path
+
+    def merge(self, other):
+        for kind in self.counters:
+            self.counts[kind] += other.counts[kind]
+        for name, value in other.bytes.items():
+            self.bytes[name] = self.bytes.get(name, 0) + value
+        self.seconds = max(self.seconds, other.seconds)
+
+    @property
+    def throughput(self):
+        """Bytes transferred per second, or None."""
+        if 'transferred' not in self.bytes or self.seconds <= 0:
+            return None
+        return self.bytes['transferred'] / self.seconds
+
+    def __str__(self):
+        fields = [f"{kind}={self.counts[kind]}" for kind in self.counters]
+        fields += [f"{name}={self.bytes[name]}" for name in STATS.values() if name in self.bytes]
+        fields.append(f"seconds={self.seconds:.1f}")
+        return ' '.join(fields)
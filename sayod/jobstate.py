@@ -0,0 +1,48 @@
+"""Measurements from earlier runs of this job, e.g. how long copying each
+source took. They are kept in $XDG_STATE_HOME/sayod/jobs/ and are only used
+to plan the next run, so losing them does no harm."""
+
+import json
+import logging
+import os
+
+from .config import Config, _Config
+
+jlog = logging.getLogger(__name__)
+
+
+class JobState:
+    @classmethod
+    def path(cls):
+        name = Config.get().find('info', 'stripped_name', 'UNKNOWN')
+        return _Config.statedir() / 'jobs' / f"{name}.json"
+
+    @classmethod
+    def load(cls):
+        try:
+            with cls.path().open(encoding='utf-8') as state:
+                return json.load(state)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            jlog.warning("Ignoring unusable %s: %s", cls.path(), e)
+            return {}
+
+    @classmethod
+    def get(cls, key, default=None):
+        return cls.load().get(key, default)
+
+    @classmethod
+    def update(cls, key, value):
+        """Sets key to value, keeping all other keys."""
+        path = cls.path()
+        state = cls.load()
+        state[key] = value
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp.open('w', encoding='utf-8') as out:
+                json.dump(state, out, indent=1)
+            os.replace(tmp, path)
+        except OSError as e:
+            jlog.warning("Cannot store job state in %s: %s", path, e)
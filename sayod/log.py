@@ -1,10 +1,29 @@
-"""provide cmd line option and retrieval for a python logger"""
+"""provide cmd line option and retrieval for a python logger
 
+Records are put into a queue by the logging calls and written to the
+journal and to stderr by a background thread, so that logging never waits
+for the journal socket. The level of the root logger is the lowest level of
+all handlers; code that produces large debug output checks
+isEnabledFor(logging.DEBUG) first."""
+
+import atexit
 import logging
-from systemd.journal import JournalHandler
+import logging.handlers
+import queue
 
 root_log = logging.getLogger('sayod')
 
+levels = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # the message is merged with its arguments now, as these may change, but
+        # formatting is left to the handlers in the other thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
 
 class Log:
     @classmethod
@@ -15,29 +34,66 @@ class Log:
                            action='store',
                            dest='log_level',
                            default=default_level,
-                           choices=('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'),
+                           choices=levels,
                            help='Sets the logging level',
                            required=False
                            )
+        group.add_argument('--journal-level',
+                           action='store',
+                           dest='journal_level',
+                           default='DEBUG',
+                           choices=levels,
+                           help='Sets the logging level for the journal',
+                           required=False
+                           )
         cls.init_root()
 
+    _root_ready = False
+    _journal = None
+    _listener = None
+
     @classmethod
     def init_root(cls):
-        root_log.setLevel(logging.DEBUG)
-        jh = JournalHandler(SYSLOG_IDENTIFIER='sayod')
-        jh.setLevel(logging.DEBUG)
+        if cls._root_ready:
+            return
+        # pylint: disable=import-outside-toplevel
+        from systemd.journal import JournalHandler
+        cls._journal = JournalHandler(SYSLOG_IDENTIFIER='sayod')
+        cls._journal.setLevel(logging.DEBUG)
         jf = logging.Formatter('%(name)s: %(message)s')
-        jh.setFormatter(jf)
-        root_log.addHandler(jh)
+        cls._journal.setFormatter(jf)
+        records = queue.SimpleQueue()
+        cls._listener = logging.handlers.QueueListener(records, cls._journal,
+                                                       respect_handler_level=True)
+        cls._listener.start()
+        atexit.register(cls.close)
+        root_log.addHandler(_QueueHandler(records))
+        cls._update_level()
+        # only now, so that a failed setup is tried again:
+        cls._root_ready = True
+
+    @classmethod
+    def _update_level(cls):
+        root_log.setLevel(min(h.level for h in cls._listener.handlers))
+
+    @classmethod
+    def close(cls):
+        """Waits until all queued records have been written."""
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener = None
 
     @classmethod
     def init(cls, **kwargs):
+        cls.init_root()
         sh = logging.StreamHandler()
         sh.setLevel(kwargs.get('log_level', logging.WARNING))
-        root_log.addHandler(sh)
+        cls._journal.setLevel(kwargs.get('journal_level', logging.DEBUG))
+        cls._listener.handlers += (sh,)
+        cls._update_level()
         name = kwargs.get('name', None)
         if name is None:
             return
         jf = logging.Formatter(f"%(name)s [{name}]: %(message)s")
-        for h in root_log.handlers:
+        for h in cls._listener.handlers:
             h.setFormatter(jf)
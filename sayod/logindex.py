@@ -0,0 +1,235 @@
+"""Persistent information kept next to a TaggedLog file.
+
+LogOrder remembers up to which offset the lines of the log have been
+checked and from which offset on they are in time order. LogIndex
+additionally records the offset and the subject of every line, so that
+queries only need to read the lines with the subjects they look for.
+
+Both files start with a fixed header that describes the log they belong
+to. The index file continues with one fixed-width record per line, in
+log order, so that a process only reads the header when it starts and
+can seek to the records of any part of the log. The subjects are numbered
+in ${file}.idx.subjects, one per line. Files are updated while holding a
+lock on them, so that processes which update at the same time neither
+lose nor duplicate records."""
+
+import fcntl
+import logging
+import os
+from pathlib import Path
+import struct
+
+ilog = logging.getLogger(__name__)
+
+
+def raw_subject(line):
+    """Returns the subject token of a raw log line (bytes) without parsing it."""
+    first = line.find(b' ')
+    if first != 19 or line[10:11] != b'T':
+        return line[:first].strip() if first >= 0 else line.strip()
+    second = line.find(b' ', 20)
+    return line[20:second].strip() if second >= 0 else line[20:].strip()
+
+
+def split_line(line):
+    """Returns (date token, subject token) of a raw log line (bytes)."""
+    date = None
+    if line.find(b' ') == 19 and line[10:11] == b'T':
+        date = line[:19].decode('ascii', 'replace')
+    return date, raw_subject(line).decode('utf-8', 'replace')
+
+
+class LogOrder:
+    suffix = '.order'
+    magic = b'sayodix2'
+    # magic, inode and size of the log, the offset from which on its lines are
+    # in time order, the latest date, the latest date before that offset and
+    # the number of index records:
+    header = struct.Struct('<8sQQQ19s19sQ')
+    # lines without date are taken to be from now by TaggedEntry, i.e. newer
+    # than every dated line:
+    undated = '9999-12-31T23:59:59'
+
+    def __init__(self, log_file):
+        self.path = Path(str(log_file) + self.suffix)
+        self.reset()
+
+    def reset(self, inode=0):
+        self.inode = inode
+        self.size = 0
+        self.ordered_from = 0
+        self.last_date = ''
+        self.before = ''
+        self.count = 0
+
+    @property
+    def ordered(self):
+        return self.ordered_from == 0
+
+    def _load(self, fd):
+        """Reads the header from the file descriptor fd."""
+        data = os.pread(fd, self.header.size, 0)
+        if not data:
+            self.reset()
+            return
+        try:
+            magic, self.inode, self.size, self.ordered_from, last_date, before, self.count = \
+                self.header.unpack(data)
+            if magic != self.magic:
+                raise ValueError("unknown format")
+            self.last_date = last_date.rstrip(b'\0').decode('ascii')
+            self.before = before.rstrip(b'\0').decode('ascii')
+        except (struct.error, ValueError) as e:
+            ilog.warning("Rebuilding unusable %s: %s", self.path, e)
+            self.reset()
+
+    def _save(self, fd, new):
+        """Writes the header to the file descriptor fd; new are (offset, subject)
+        of the lines that have been added."""
+        # pylint: disable=unused-argument
+        os.pwrite(fd, self.header.pack(self.magic, self.inode, self.size, self.ordered_from,
+                                       self.last_date.encode('ascii', 'replace'),
+                                       self.before.encode('ascii', 'replace'),
+                                       self.count), 0)
+
+    def _lock(self, mode):
+        """Opens and locks the file. If it has been removed while waiting for
+        the lock, e.g. by rotation, the new file is opened instead."""
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, mode)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.path).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def update(self, raw):
+        """Adds all complete lines of the binary file object raw which have been
+        appended since the last update."""
+        st = os.fstat(raw.fileno())
+        try:
+            fd = self._lock(st.st_mode & 0o666)
+        except OSError as e:
+            # a read-only log can still use what is kept in memory.
+            ilog.debug("Cannot write %s: %s", self.path, e)
+            self._scan(raw, st)
+            # but the records on disk do not describe it:
+            self.count = None
+            return
+        try:
+            self._load(fd)
+            new = self._scan(raw, st)
+            if new:
+                self._save(fd, new)
+        finally:
+            os.close(fd)
+
+    def _scan(self, raw, st):
+        """Adds the new lines of raw, whose stat result is st, and returns
+        (offset, subject) of each."""
+        if st.st_ino != self.inode or st.st_size < self.size:
+            if self.inode:
+                ilog.info("Rebuilding %s", self.path)
+            self.reset(st.st_ino)
+        new = []
+        if st.st_size == self.size:
+            return new
+        raw.seek(self.size, 0)
+        offset = self.size
+        for line in raw:
+            if not line.endswith(b'\n'):
+                # incomplete line, maybe somebody is still writing.
+                break
+            new.append((offset, self.add(offset, line)))
+            offset += len(line)
+        return new
+
+    def add(self, offset, line):
+        """Takes the line at offset into account and returns its subject."""
+        date, subject = split_line(line)
+        # undated lines are out of order as well. Only the lines up to here need
+        # to be read in full, e.g. after entries from an outbox have been
+        # delivered late:
+        if date is None or date < self.last_date:
+            if self.ordered:
+                ilog.warning("Line at offset %d is out of time order", offset)
+            self.ordered_from = offset + len(line)
+            self.before = max(self.before, self.last_date if date else self.undated)
+        if date is not None:
+            self.last_date = max(date, self.last_date)
+        self.size = offset + len(line)
+        return subject
+
+
+class LogIndex(LogOrder):
+    suffix = '.idx'
+    # offset of a line and the number of its subject:
+    record = struct.Struct('<QI')
+    # number of records that are read at once
+    block = 4096
+
+    @property
+    def names(self):
+        """The file with the subjects, one per line."""
+        return self.path.with_name(self.path.name + '.subjects')
+
+    def _subjects(self):
+        try:
+            return self.names.read_text(encoding='utf-8').split('\n')[:-1]
+        except FileNotFoundError:
+            return []
+
+    def _save(self, fd, new):
+        subjects = self._subjects()
+        numbers = {subject: number for number, subject in enumerate(subjects)}
+        added = [subject for subject in dict.fromkeys(subject for _, subject in new)
+                 if subject not in numbers]
+        if added:
+            with self.names.open('a', encoding='utf-8') as names:
+                names.write(''.join(f"{subject}\n" for subject in added))
+            numbers.update((subject, len(subjects) + n) for n, subject in enumerate(added))
+        # records beyond count are left over from a reset or an interrupted save:
+        end = self.header.size + self.count * self.record.size
+        os.ftruncate(fd, end)
+        os.pwrite(fd, b''.join(self.record.pack(offset, numbers[subject])
+                               for offset, subject in new), end)
+        self.count += len(new)
+        super()._save(fd, new)
+
+    def offsets(self, subjects, exclude=(), span=(0, None), reverse=False):
+        """Iterates over the offsets of all lines with one of the given subjects
+        which start within span, i.e., (start, end) with None for the end of
+        the log, ascending or reversed. No subjects means all subjects but the
+        excluded ones. None if the index cannot provide all lines."""
+        if self.count is None or not (subjects or exclude):
+            return None
+        wanted = {number for number, subject in enumerate(self._subjects())
+                  if (not subjects or subject in subjects) and subject not in exclude}
+        return self._records(wanted, (self.count, *span), reverse)
+
+    def _first(self, idx, count, offset):
+        """Number of the first record from offset on."""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            idx.seek(self.header.size + mid * self.record.size, 0)
+            if self.record.unpack(idx.read(self.record.size))[0] < offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _records(self, wanted, bounds, reverse):
+        count, start, end = bounds
+        with self.path.open('rb') as idx:
+            first = self._first(idx, count, start)
+            last = count if end is None else self._first(idx, count, end)
+            blocks = range(first, last, self.block)
+            for lo in reversed(blocks) if reverse else blocks:
+                idx.seek(self.header.size + lo * self.record.size, 0)
+                data = idx.read((min(lo + self.block, last) - lo) * self.record.size)
+                found = [offset for offset, subject in self.record.iter_unpack(data)
+                         if subject in wanted]
+                yield from reversed(found) if reverse else found
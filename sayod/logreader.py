@@ -4,16 +4,16 @@ import logging
 from .config import Config
 from .log import Log
 from .plain_log import PlainLog
-from .taggedlog import TaggedLog
+from .status import status_log
 
 lrlog = logging.getLogger(__name__)
 
 
-def get_subjects(**kwargs):
+def get_subjects(stdin, **kwargs):
     if kwargs.get('subject', False):
         return kwargs['subject']
     subject_list = []
-    for line in sys.stdin:
+    for line in stdin:
         if line.strip() == "":
             break
         subject_list.append(line.strip())
@@ -23,58 +23,74 @@ def get_subjects(**kwargs):
     return subject_list
 
 
-def get_action(**kwargs):
+def get_action(stdin, **kwargs):
     if kwargs.get('action', False):
         return kwargs['action']
     action = PlainLog.LIST
-    for line in sys.stdin:
+    for line in stdin:
         if line.strip():
             action = line.strip()
     return action
 
 
-def read_log(**kwargs):
-    status_file = Config.get().find('status', 'file', None)
-    if status_file is None:
-        lrlog.warning("Status file cannot be determined")
-        raise SystemExit(1)
-    log_obj = TaggedLog(status_file, 'r')
+def read_log(stdin=None, **kwargs):
+    stdin = sys.stdin if stdin is None else stdin
+    log_obj = status_log('r')
 
-    subject_list = get_subjects(**kwargs)
-    action = get_action(**kwargs)
+    subject_list = get_subjects(stdin, **kwargs)
+    action = get_action(stdin, **kwargs)
     lrlog.info("Looking into TaggedLog for %s on %s", action, subject_list)
 
-    entries = log_obj.find(subjects=subject_list, action=action)
-    return entries
+    if action == PlainLog.LIST:
+        return log_obj.find_iter(subjects=subject_list)
+    return log_obj.find(subjects=subject_list, action=action)
 
 
 class LogReader:
     prog = 'logreader'
-    print_result = True
 
     @classmethod
-    def add_subparser(cls, sp):
-        ap = sp.add_parser(cls.prog, help='Serves excerpts from the remote log.')
+    def add_subparser(cls, sp, helptext):
+        ap = sp.add_parser(cls.prog, help=helptext)
         PlainLog.add_options(ap)
         return ap
 
     @classmethod
     def standalone(cls, **kwargs):
-        return '\n'.join(list(str(x) for x in read_log(**kwargs)))
+        cls.answer(sys.stdin, sys.stdout, **kwargs)
 
+    @classmethod
+    def answer(cls, stdin, stdout, **kwargs):
+        # entries are written as they are found instead of collecting them first.
+        for entry in read_log(stdin, **kwargs):
+            stdout.write(f"{entry}\n")
+
+    @classmethod
+    def batch(cls, stdin=None, stdout=None):
+        """Answers all queries from STDIN with one look into the log."""
+        queries = PlainLog.read_queries(sys.stdin if stdin is None else stdin)
+        lrlog.info("Answering %d queries", len(queries))
+        results = status_log('r').find_batch(queries)
+        for qid, result in results.items():
+            PlainLog.write_answer(sys.stdout if stdout is None else stdout, qid, result)
 
-# entry point for 'logreader' command as created by installing the wheel
+    @classmethod
+    def serve(cls, stdin, stdout, content_type):
+        """Handles one request whose header has already been read and whose
+        configuration is active."""
+        if content_type == PlainLog.BATCH:
+            cls.batch(stdin, stdout)
+            return
+        if content_type != "text/x-plain-ask":
+            lrlog.warning("Unknown content-type %s", content_type)
+        cls.answer(stdin, stdout)
+
+
+# handles a request in this process, see daemonclient.logreader
 def logreader():
     Log.init_root()
     lrlog.info("Starting %s", __name__)
-    line = sys.stdin.readline().strip()
-    content_type = "text/x-plain-ask"
-    if line.startswith("content-type: "):
-        content_type = line[len("content-type: "):]
-        lrlog.debug("received %s", line)
-        line = sys.stdin.readline().strip()
-    if content_type != "text/x-plain-ask":
-        lrlog.warning("Unknown content-type %s", content_type)
+    content_type, line = PlainLog.read_header(sys.stdin, "text/x-plain-ask")
+    lrlog.debug("received %s for %s", content_type, line)
     Config.init(configuration_file=line)
-
-    print(LogReader.standalone())
+    LogReader.serve(sys.stdin, sys.stdout, content_type)
@@ -1,10 +1,9 @@
 import logging
 from email.message import EmailMessage
 from smtplib import SMTP
-from gnupg import GPG
 
 from .config import Config
-from .taggedlog import TaggedEntry
+from .taggedentry import TaggedEntry
 
 mlog = logging.getLogger(__name__)
 
@@ -16,6 +15,8 @@ class Mailer:
     def sign(self, key):
         if not key or not key.startswith('0x'):
             return
+        # pylint: disable=import-outside-toplevel
+        from gnupg import GPG
         gpg = GPG()
         gpg.encoding = 'utf-8'
         self.text = str(gpg.sign(self.text, clearsign=True, keyid=key))
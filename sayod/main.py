@@ -16,7 +16,7 @@ def _run():
     Config.init(**args_dict)
     Log.init(**args_dict, name=Config.get().find('info', 'stripped_name', None))
     subcommand = args_dict['subcommand']
-    command_klass = Arguments.command_dict.get(subcommand, False)
+    command_klass = Arguments.klass(subcommand)
     mlog.info("Executing sayod-backup (v%s) with %s", __version__, subcommand)
     Notify.init(**args_dict)
 
@@ -50,6 +50,8 @@ def run():
         if Notify.get():
             Notify.get().fatal("Sayod failed hard:", str(e))
         print(e)
+    finally:
+        Notify.close()
 
 
 if __name__ == '__main__':
@@ -4,12 +4,19 @@
 sensible stuff"""
 
 import argparse
+import datetime
 import logging
 import os
+import queue
 from subprocess import run, Popen, PIPE, DEVNULL
 import textwrap
+import threading
 
-from .config import Config
+from .config import Config, _Config
+from .outbox import Outbox
+from .sshsession import SshSession
+from .successcache import SuccessCache
+from .taggedentry import TaggedEntry
 nlog = logging.getLogger(__name__)
 
 
@@ -42,6 +49,21 @@ class _Notify:
         }
         if self.ssh['pipe'] in ('no', 'nein', 'false'):
             self.ssh['pipe'] = False
+        self.session = SshSession(
+            self.ssh['user'], self.ssh['host'], self.ssh['port'],
+            multiplex=Config.get().find('notify', 'multiplex', 'yes') in ('yes', 'ja', 'true'),
+            persist=Config.get().find('notify', 'persist', '600'))
+        # notifications are delivered by a worker thread, so that the backup does
+        # not have to wait for notify-send and ssh:
+        self.background = Config.get().find('notify', 'background', 'yes') in ('yes', 'ja', 'true')
+        self.queue = queue.Queue(int(Config.get().find('notify', 'queue', 16)))
+        self.worker = None
+        # entries which could not be sent are kept here; sending them needs a
+        # receiver which understands batches:
+        self.outbox = None
+        if Config.get().find('notify', 'outbox', 'no') in ('yes', 'ja', 'true'):
+            self.outbox = Outbox(_Config.statedir() / 'outbox'
+                                 / f"{self.ssh['remote']}@{self.ssh['host']}")
 
     def notify_local(self, long_msg, **kwargs):
         msg = textwrap.fill(long_msg, width=72)[0:131071]
@@ -58,30 +80,99 @@ class _Notify:
         nlog.info('NOTIFY-SEND %s', head)
         nlog.info(long_msg)
 
+    def _work(self):
+        while True:
+            msg, kwargs = self.queue.get()
+            try:
+                self.deliver(msg, **kwargs)
+            except Exception as e:
+                nlog.exception("Cannot deliver notification")
+                self.notify_local(f'Kann Meldung nicht zustellen:\n{e}',
+                                  head='Backup-Fehler {}',
+                                  urgency='critical',
+                                  timeout=Config.get().timeout('fatal', 60*60*1000))
+            finally:
+                self.queue.task_done()
+
     def notify(self, *msg_args, **kwargs):
+        """Shows the message and writes it to the remote log, in the background if
+        configured. kwargs['delivered'] is called once it is in the remote log."""
         msg = " ".join(msg_args)
+        if not self.background:
+            self.deliver(msg, **kwargs)
+            return
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._work, name='notify', daemon=True)
+            self.worker.start()
+        # blocks if too many notifications are waiting:
+        self.queue.put((msg, kwargs))
+
+    def flush(self):
+        """Waits until all notifications have been delivered."""
+        if self.worker is not None:
+            self.queue.join()
+
+    def _send(self, content_type, lines):
+        """Runs receiver on the host with lines as input; returns its stderr if it
+        fails, None otherwise."""
+        nlog.debug("sshing()")
+        returncode = False
+        with Popen(self.session.command('receiver'),
+                   text=True,
+                   stdin=PIPE,
+                   stdout=PIPE,
+                   stderr=PIPE) as proc:
+            proc.stdin.write(f'content-type: {content_type}\n')
+            proc.stdin.write(self.ssh['remote'] + "\n")
+            for line in lines:
+                proc.stdin.write(line)
+            proc.stdin.close()
+            returncode = proc.wait()
+            errs = proc.stderr.read()
+        return errs if returncode != 0 else None
+
+    def flush_outbox(self, entry=None):
+        """Sends all kept entries, and entry, in one session. Whatever cannot be
+        sent is kept. Returns whether everything has been sent."""
+        with self.outbox.lock():
+            kept = self.outbox.entries()
+            entries = [e for _, e in kept] + ([entry] if entry is not None else [])
+            if not entries:
+                return True
+            nlog.info("Sending %d entries to the remote log", len(entries))
+            if kept:
+                errs = self._send('text/x-plain-log-batch', [f"{e}\n" for e in entries])
+            else:
+                # a single new entry is sent as usual; its date is set by the receiver.
+                errs = self._send('text/x-plain-log', [f"{entry.subject}\n", entry.content])
+            if errs is None:
+                self.outbox.remove(path for path, _ in kept)
+                return True
+            if entry is not None:
+                self.outbox.put(entry)
+        self.notify_local(
+             'Kann Meldungen nicht auf dem Server schreiben, sie werden später '
+             'nachgeliefert:\n' + oneline(errs),
+             head='Backup-Fehler {}',
+             urgency='critical',
+             timeout=Config.get().timeout('fatal', 60*60*1000)
+             )
+        return False
+
+    def deliver(self, msg, **kwargs):
         self.notify_local(msg, **kwargs)
-        if self.ssh['pipe']:
-            nlog.debug("sshing()")
-            returncode = False
-            with Popen(['ssh',
-                        '-l', self.ssh['user'],
-                        self.ssh['host'],
-                        '-p', self.ssh['port'],
-                        'receiver'
-                        ],
-                       text=True,
-                       stdin=PIPE,
-                       stdout=PIPE,
-                       stderr=PIPE) as proc:
-                proc.stdin.write('content-type: text/x-plain-log\n')
-                proc.stdin.write(self.ssh['remote'] + "\n")
-                proc.stdin.write(kwargs.get('subject', '') + "\n")
-                proc.stdin.write(msg)
-                proc.stdin.close()
-                returncode = proc.wait()
-                errs = proc.stderr.read()
-            if returncode != 0:
+        if not self.ssh['pipe']:
+            nlog.info('content-type: text/x-plain-log')
+            nlog.info(self.ssh['remote'])
+            nlog.info(kwargs.get('subject', ''))
+            nlog.info(msg)
+            return
+        if self.outbox is not None:
+            sent = self.flush_outbox(TaggedEntry(msg.strip(), kwargs.get('subject', None) or None))
+        else:
+            errs = self._send('text/x-plain-log', [kwargs.get('subject', '') + "\n", msg])
+            sent = errs is None
+            if not sent:
                 self.notify_local(
                      'Kann Meldungen nicht auf dem Server schreiben:\n'
                      + oneline(errs),
@@ -89,18 +180,17 @@ class _Notify:
                      urgency='critical',
                      timeout=Config.get().timeout('fatal', 60*60*1000)
                      )
-        else:
-            nlog.info('content-type: text/x-plain-log')
-            nlog.info(self.ssh['remote'])
-            nlog.info(kwargs.get('subject', ''))
-            nlog.info(msg)
+        if sent and kwargs.get('delivered', None) is not None:
+            kwargs['delivered']()
 
     def success(self, *args):
+        now = datetime.datetime.now()
         self.notify(*args,
                     subject='SUCCESS',
                     urgency='low',
                     head='Backup {}: Erfolg',
-                    timeout=Config.get().timeout('success', 4*1000)
+                    timeout=Config.get().timeout('success', 4*1000),
+                    delivered=lambda: SuccessCache.store(now)
                     )
 
     def fatal(self, *args):
@@ -159,9 +249,8 @@ class Notify:
                            default=True)
 
     @classmethod
-    def add_subparser(cls, sp):
-        ap = sp.add_parser(cls.prog, help='''Creates notifications, both to the user and to the
-                                             remote log.''')
+    def add_subparser(cls, sp, helptext):
+        ap = sp.add_parser(cls.prog, help=helptext)
         ap.add_argument('--level', required=True,
                         choices='abort deadtime fail fatal start success'.split())
         ap.add_argument('notification_text', nargs='+')
@@ -175,6 +264,12 @@ class Notify:
     def get(cls):
         return cls._instance
 
+    @classmethod
+    def close(cls):
+        if cls._instance is not None:
+            cls._instance.flush()
+            cls._instance.session.close()
+
     @classmethod
     def standalone(cls, **kwargs):
         getattr(cls._instance, kwargs.get('level', 'start'))(*kwargs.get('notification_text'))
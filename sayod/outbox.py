@@ -0,0 +1,62 @@
+"""Notifications that could not be written to the remote log are kept here
+until the next connection to the log host succeeds."""
+
+from contextlib import contextmanager
+import fcntl
+import itertools
+import logging
+import os
+from pathlib import Path
+
+from .taggedentry import TaggedEntry
+
+oblog = logging.getLogger(__name__)
+
+
+class Outbox:
+    suffix = '.entry'
+    _counter = itertools.count()
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def __bool__(self):
+        try:
+            return any(p.suffix == Outbox.suffix for p in self.path.iterdir())
+        except FileNotFoundError:
+            return False
+
+    def put(self, entry):
+        """Stores entry as one log line in a file of its own."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        name = f"{entry.date:%Y%m%d%H%M%S}-{os.getpid()}-{next(Outbox._counter)}"
+        tmp = self.path / (name + '.tmp')
+        with tmp.open('w', encoding='utf-8') as spool:
+            spool.write(f"{entry}\n")
+        os.replace(tmp, self.path / (name + Outbox.suffix))
+        oblog.info("Kept %s in %s for later delivery", entry.subject, self.path)
+
+    def entries(self):
+        """(path, entry) pairs of all stored entries, oldest first."""
+        try:
+            paths = sorted(p for p in self.path.iterdir() if p.suffix == Outbox.suffix)
+        except FileNotFoundError:
+            return []
+        result = []
+        for path in paths:
+            with path.open(encoding='utf-8') as spool:
+                result.append((path, TaggedEntry(spool.read())))
+        return result
+
+    @contextmanager
+    def lock(self):
+        """Only one process may deliver the stored entries at a time."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with (self.path / '.lock').open('w') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            yield self
+
+    @classmethod
+    def remove(cls, paths):
+        for path in paths:
+            path.unlink(missing_ok=True)
@@ -1,11 +1,18 @@
 """Things for plain log protocoll"""
 
+from .taggedentry import TaggedEntry, parse_date
+
 
 class PlainLog:
     LAST = "last"
     COUNT = "count"
     FIRST = "first"
     LIST = "list"
+    # several queries in one session, see write_queries and write_answer:
+    BATCH = "text/x-plain-ask-batch"
+    # keys of a query that are sent, and whether they hold a list or a date:
+    query_keys = {'subjects': list, 'exclude': list, 'since': 'date', 'until': 'date',
+                  'after': str}
 
     @classmethod
     def add_options(cls, parser):
@@ -14,3 +21,82 @@ class PlainLog:
                             help='specify which action should be read from the log',
                             default=cls.LIST,
                             choices=[cls.LAST, cls.COUNT, cls.FIRST, cls.LIST])
+
+    @classmethod
+    def read_header(cls, stream, content_type):
+        """Reads the optional content-type line and the configuration line that
+        start every request; returns both. content_type is the default."""
+        line = stream.readline().strip()
+        if line.startswith("content-type: "):
+            content_type = line[len("content-type: "):]
+            line = stream.readline().strip()
+        return content_type, line
+
+    @classmethod
+    def write_queries(cls, stream, queries):
+        """Writes queries (id -> find() arguments) in the batch format:
+
+            query: ID ACTION
+            subjects: SUBJECT ...
+            since: DATE
+            after: ID
+
+        Each query ends with an empty line."""
+        for qid, query in queries.items():
+            stream.write(f"query: {qid} {query.get('action', cls.LIST)}\n")
+            for key, kind in cls.query_keys.items():
+                value = query.get(key, None)
+                if not value:
+                    continue
+                if kind is list:
+                    value = ' '.join(value)
+                elif kind == 'date':
+                    value = f"{value:{TaggedEntry.timeformat}}"
+                stream.write(f"{key}: {value}\n")
+            stream.write("\n")
+
+    @classmethod
+    def read_queries(cls, stream):
+        queries = {}
+        query = None
+        for line in stream:
+            line = line.strip()
+            if not line:
+                query = None
+                continue
+            key, _, value = line.partition(': ')
+            if key == 'query':
+                qid, _, action = value.partition(' ')
+                query = queries[qid] = {'action': action or cls.LIST}
+            elif query is None or key not in cls.query_keys:
+                raise ValueError(f"Unexpected line in query: {line}")
+            elif cls.query_keys[key] is list:
+                query[key] = value.split()
+            elif cls.query_keys[key] == 'date':
+                query[key] = parse_date(value)
+            else:
+                query[key] = value
+        return queries
+
+    @classmethod
+    def write_answer(cls, stream, qid, result):
+        """Writes the result of find() for query qid as "answer: ID N" followed by
+        N lines. A missing entry is not written at all."""
+        lines = [str(r) for r in result if r is not None]
+        stream.write(f"answer: {qid} {len(lines)}\n")
+        for line in lines:
+            stream.write(f"{line}\n")
+
+    @classmethod
+    def read_answers(cls, stream):
+        """Returns id -> list of lines for all answers in stream."""
+        answers = {}
+        for line in stream:
+            if not line.strip():
+                continue
+            key, _, value = line.strip().partition(': ')
+            if key != 'answer':
+                raise ValueError(f"Unexpected line in answer: {line.strip()}")
+            qid, _, count = value.rpartition(' ')
+            answers[qid] = [next(stream).rstrip('\n') for _ in range(int(count))]
+        return answers
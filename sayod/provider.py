@@ -5,15 +5,6 @@
 import logging
 import os
 from pathlib import Path
-try:
-    from PySide6.QtWidgets import QMessageBox, QApplication
-    from PySide6.QtCore import QTimer
-except ImportError:
-    try:
-        from PySide2.QtWidgets import QMessageBox, QApplication
-        from PySide2.QtCore import QTimer
-    except ImportError:
-        QApplication = None
 import select
 import subprocess
 import sys
@@ -30,6 +21,22 @@ class ProvideError(Exception):
     pass
 
 
+def _qt():
+    """(QApplication, QMessageBox, QTimer) from PySide6 or PySide2; None if neither
+    is installed. Only imported when a dialog may be shown, because it takes long."""
+    # pylint: disable=import-outside-toplevel
+    try:
+        from PySide6.QtWidgets import QMessageBox, QApplication
+        from PySide6.QtCore import QTimer
+    except ImportError:
+        try:
+            from PySide2.QtWidgets import QMessageBox, QApplication
+            from PySide2.QtCore import QTimer
+        except ImportError:
+            return None
+    return QApplication, QMessageBox, QTimer
+
+
 class PostrequisiteError(ProvideError):
     pass
 
@@ -146,11 +153,11 @@ class SayodProvider(Provider):
         self.command = config.pop('command', '')
         if not self.command:
             raise ProvideError(f'Cannot find ActionProvider {name}::command')
-        self.command_klass = Arguments.combine_dict.get(self.command, False)
-        if not self.command_klass:
-            if self.command in Arguments.command_dict:
+        if not Arguments.combinable(self.command):
+            if Arguments.klass(self.command) is not None:
                 raise ProvideError(f'Command {self.command} cannot be used as Action!')
             raise ProvideError(f'Command {self.command} not found!')
+        self.command_klass = Arguments.klass(self.command)
         plog.info("subcommand results in class %s", self.command_klass)
         self.run_before = config.get('before', 'yes') != 'no'
 
@@ -215,15 +222,18 @@ class ManualProvider(Provider):
     def acquire(self):
         if not super().acquire():
             return self.failure()
-        if QApplication and os.environ.get('DISPLAY', False):
-            return self.dialog_()
+        if os.environ.get('DISPLAY', False):
+            qt = _qt()
+            if qt is not None:
+                return self.dialog_(*qt)
         return self.commandline_()
 
     def dialog_closer_(self, app):
         app.closeAllWindows()
         self.dialog_timed_out = True
 
-    def dialog_(self):
+    def dialog_(self, QApplication, QMessageBox, QTimer):
+        # pylint: disable=invalid-name
         if not QApplication.instance():
             app = QApplication(['ManualProvider'])
         else:
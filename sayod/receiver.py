@@ -3,8 +3,9 @@ import sys
 
 from .config import Config
 from .log import Log
-from .taggedentry import FromStream
-from .taggedlog import TaggedLog
+from .plain_log import PlainLog
+from .status import rotate_status, status_log
+from .taggedentry import FromBatch, FromStream
 from .version import __version__
 
 rlog = logging.getLogger(__name__)
@@ -14,25 +15,32 @@ class _Receiver:
     def __init__(self, content_type):
         self.content_type = content_type
 
-    def run(self):
-        status_file = Config.get().find('status', 'file', None)
-        if status_file is None:
-            rlog.warning("Status file cannot be determined")
-            raise SystemExit(1)
-        log_obj = TaggedLog(status_file, 'a+')
-        entry = FromStream(sys.stdin, self.content_type)
-        log_obj.append(entry)
+    def run(self, stdin=None):
+        stdin = sys.stdin if stdin is None else stdin
+        log_obj = status_log('a+')
+        if self.content_type == 'text/x-plain-log-batch':
+            entries = FromBatch(stdin)
+            rlog.debug("received %d entries", len(entries))
+            log_obj.append_many(entries)
+        else:
+            log_obj.append(FromStream(stdin, self.content_type))
+        try:
+            rotate_status()
+        # the entries have been written; failing now would make the sender send
+        # them again.
+        except Exception:  # pylint: disable=broad-exception-caught
+            rlog.exception("Cannot rotate the status log")
 
 
 class Receiver:
     '''Reads new log entries from STDIN and adds them to the appropriate log.  Communication follows
-    text/x-plain-log type'''
+    text/x-plain-log or text/x-plain-log-batch type'''
     prog = 'receive'
     _instance = None
 
     @classmethod
-    def add_subparser(cls, sp):
-        return sp.add_parser(cls.prog, help='Receives new entries for the remote log.')
+    def add_subparser(cls, sp, helptext):
+        return sp.add_parser(cls.prog, help=helptext)
 
     @classmethod
     def standalone(cls, **_):
@@ -40,21 +48,22 @@ class Receiver:
             cls._instance = _Receiver('text/x-plain-log')
         cls._instance.run()
 
+    @classmethod
+    def serve(cls, stdin, content_type):
+        """Handles one request whose header has already been read and whose
+        configuration is active."""
+        _Receiver(content_type).run(stdin)
+
     @classmethod
     def init_from_stdin(cls):
-        line = sys.stdin.readline().strip()
-        content_type = "text/x-plain-log"
-        if line.startswith("content-type: "):
-            content_type = line[len("content-type: "):]
-            rlog.debug("received %s", line)
-            line = sys.stdin.readline().strip()
-        rlog.debug("received %s", line)
+        content_type, line = PlainLog.read_header(sys.stdin, "text/x-plain-log")
+        rlog.debug("received %s for %s", content_type, line)
         Log.init(name="receiver " + line.strip())
         Config.init(configuration_file=line)
         cls._instance = _Receiver(content_type)
 
 
-# entry point for 'receiver' command as created by installing the wheel
+# handles a request in this process, see daemonclient.receiver
 def receiver():
     try:
         Log.init_root()
@@ -62,5 +71,7 @@ def receiver():
         Receiver.init_from_stdin()
         Receiver.standalone()
         rlog.debug("receiver end")
-    except Exception:
+    except Exception as exc:
         rlog.exception("Program failed hard")
+        # the sender keeps what has not been written:
+        raise SystemExit(1) from exc
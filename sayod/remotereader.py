@@ -4,6 +4,7 @@ were found"""
 import logging
 from subprocess import Popen, PIPE
 
+from .config import Config
 from .notify import Notify, oneline
 from .plain_log import PlainLog
 from .taggedentry import TaggedEntry
@@ -11,16 +12,11 @@ from .taggedentry import TaggedEntry
 lrlog = logging.getLogger(__name__)
 
 
-def remote(subjects, action):
-    results = []
+def remote_iter(subjects, action):
+    """Yields the entries sent back by logreader as they arrive."""
     ssh = Notify.get().ssh
     lrlog.info("Connecting to ssh -> logreader for %s on %s", action, subjects)
-    with Popen(['ssh',
-                '-l', ssh['user'],
-                ssh['host'],
-                '-p', ssh['port'],
-                'logreader'
-                ],
+    with Popen(Notify.get().session.command('logreader'),
                text=True,
                stdin=PIPE,
                stdout=PIPE,
@@ -37,16 +33,75 @@ def remote(subjects, action):
         # count/last/first/list
         proc.stdin.write(action)
         proc.stdin.close()
+        for line in proc.stdout:
+            lrlog.debug("Received line %s", line)
+            if line.strip():
+                yield TaggedEntry(line)
         returncode = proc.wait()
         err = proc.stderr.read()
         if returncode != 0:
             Notify.get().notify_local(f"Kann entferntes Log nicht lesen:\n{oneline(err)}",
                                       head='Backup-Fehler {}')
             raise RuntimeError(err)
-        for line in proc.stdout.readlines():
-            lrlog.debug("Received line %s", line)
-            if line.strip():
-                results.append(TaggedEntry(line))
+
+
+class BatchUnsupported(RuntimeError):
+    """The host has answered, but not in the batch format; it runs an older
+    sayod."""
+
+
+def remote_batch(queries):
+    """Sends several queries (id -> find() arguments) in one session. Returns id
+    -> list of entries; counts are returned as [number]."""
+    ssh = Notify.get().ssh
+    lrlog.info("Connecting to ssh -> logreader for %d queries", len(queries))
+    with Popen(Notify.get().session.command('logreader'),
+               text=True,
+               stdin=PIPE,
+               stdout=PIPE,
+               stderr=PIPE) as proc:
+        proc.stdin.write(f'content-type: {PlainLog.BATCH}\n')
+        proc.stdin.write(ssh['remote'] + "\n")
+        PlainLog.write_queries(proc.stdin, queries)
+        proc.stdin.close()
+        try:
+            answers = PlainLog.read_answers(proc.stdout)
+        except (ValueError, StopIteration) as e:
+            answers = None
+            lrlog.error("Cannot read answers: %s", e)
+        returncode = proc.wait()
+        err = proc.stderr.read()
+    if returncode == 0 and answers is None:
+        raise BatchUnsupported("Host does not answer batches")
+    if returncode != 0 or answers is None:
+        Notify.get().notify_local(f"Kann entferntes Log nicht lesen:\n{oneline(err)}",
+                                  head='Backup-Fehler {}')
+        raise RuntimeError(err)
+    results = {}
+    for qid, query in queries.items():
+        lines = answers.get(qid, [])
+        if query.get('action', PlainLog.LIST) == PlainLog.COUNT:
+            results[qid] = [int(line) for line in lines]
+        else:
+            results[qid] = [TaggedEntry(line) for line in lines]
+    return results
+
+
+def use_batch():
+    # hosts with older sayod versions do not know the batch protocol:
+    return Config.get().find('notify', 'ask', 'plain') == 'batch'
+
+
+def remote(subjects, action):
+    if use_batch():
+        try:
+            results = remote_batch({'q': {'subjects': subjects, 'action': action}})['q']
+            if not results:
+                raise ValueError("No results received")
+            return results if action == PlainLog.LIST else results[0]
+        except BatchUnsupported:
+            lrlog.warning("Host does not understand batches, set [notify] ask = plain")
+    results = list(remote_iter(subjects, action))
     if not results:
         raise ValueError("No results received")
     if action == PlainLog.FIRST:
@@ -64,11 +119,20 @@ class RemoteReader:
     fail_empty_result = True
 
     @classmethod
-    def add_subparser(cls, sp):
-        ap = sp.add_parser(cls.prog, help='Reads contents from the remote log.')
+    def add_subparser(cls, sp, helptext):
+        ap = sp.add_parser(cls.prog, help=helptext)
         PlainLog.add_options(ap)
         return ap
 
     @classmethod
     def standalone(cls, **kwargs):
-        return remote(kwargs.get('subject', []), kwargs.get('action', 'list'))
+        subjects = kwargs.get('subject', [])
+        action = kwargs.get('action', PlainLog.LIST)
+        if action != PlainLog.LIST:
+            return remote(subjects, action)
+        # lists are printed while they are received
+        received = False
+        for entry in remote_iter(subjects, action):
+            print(entry)
+            received = True
+        return received
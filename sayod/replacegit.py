@@ -1,5 +1,6 @@
 import datetime
 import logging
+from pathlib import Path
 
 from .config import Config
 from .gitversion import Git
@@ -16,18 +17,39 @@ class ReplaceGit:
     prog = 'replace-git'
 
     @classmethod
-    def add_subparser(cls, sp):
-        ap = sp.add_parser(cls.prog,
-                           help='Creates a commit from all files in a git working directory.',
-                           )
+    def add_subparser(cls, sp, helptext):
+        ap = sp.add_parser(cls.prog, help=helptext)
         ap.add_argument('--directory', required=False)
         return ap
 
+    @classmethod
+    def stage(cls, git):
+        """Stages the paths which copy has listed in [rsync] changes, or
+        everything if there is no such list."""
+        changes = Config.get().find('rsync', 'changes', '')
+        if changes and Path(changes).is_file() and Path(changes).stat().st_size == 0:
+            # without pathspecs, git would add everything:
+            rglog.info('Copy has not changed anything, nothing to stage')
+            Path(changes).unlink()
+            return
+        if changes and Path(changes).is_file():
+            git.command('--literal-pathspecs', 'add', '--all',
+                        f'--pathspec-from-file={changes}', '--pathspec-file-nul')
+            if git.returncode == 0:
+                rglog.info('Staged the paths listed in %s', changes)
+                # they must not be staged again after the next copy:
+                Path(changes).unlink()
+                return
+            rglog.warning('Cannot stage the paths listed in %s, adding everything', changes)
+        git.command('add', '.')
+        if changes:
+            Path(changes).unlink(missing_ok=True)
+
     @classmethod
     def standalone(cls, **kwargs):
         git = Git(Config.get().find('target', 'path', kwargs.get('directory', '')))
         rglog.debug('running in %s', git.cwd)
-        git.command('add', '.')
+        cls.stage(git)
         git.command('commit', '-m', f'BACKUP {datetime.datetime.now()}')
         Notify.get().success("New commit created")
         return git.hash()
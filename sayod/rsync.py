@@ -1,14 +1,71 @@
+import collections
+import concurrent.futures
+import contextlib
 import datetime
 import logging
+import os
 from pathlib import Path
+import shutil
 import subprocess
+import threading
+import time
 
 from .config import Config
+from .itemize import ItemizeStats, unescape
+from .jobstate import JobState
 from .notify import Notify
+from .transfer import Transfer
 
 rlog = logging.getLogger(__name__)
 
 
+def severity(returncode):
+    """Orders exit codes of rsync like notify_result does: success, partial
+    transfer, abort, error, wrong usage."""
+    if returncode == 0:
+        return 0
+    if returncode in (23, 24):
+        return 1
+    if returncode == 20:
+        return 2
+    if returncode in (1, 2, 4, 6):
+        return 4
+    return 3
+
+
+class Lines:
+    """Counts lines and keeps only the first and the last few of them."""
+    def __init__(self, keep=10):
+        self.keep = keep
+        self.count = 0
+        self.head = []
+        self.tail = collections.deque(maxlen=keep)
+
+    def add(self, line):
+        self.count += 1
+        if len(self.head) < self.keep:
+            self.head.append(line)
+        else:
+            self.tail.append(line)
+
+    def __len__(self):
+        return self.count
+
+    def merge(self, other):
+        kept = list(other)
+        for line in kept:
+            self.add(line)
+        # kept may contain a line for the skipped ones:
+        self.count += other.count - len(kept)
+
+    def __iter__(self):
+        yield from self.head
+        skipped = self.count - len(self.head) - len(self.tail)
+        if skipped:
+            yield f"[{skipped} lines skipped]"
+        yield from self.tail
+
+
 class RSync:
     # pylint: disable=too-many-instance-attributes
     def __init__(self):
@@ -16,11 +73,21 @@ class RSync:
         self.exe_args = ['rsync']
         self.options = []
         self.fill_options()
-        self.popen_args = {'stdout': subprocess.PIPE, 'stderr': subprocess.PIPE, 'text': True}
-        self.stderr = ""
-        self.stdout = ""
+        self.popen_args = {'stdout': subprocess.PIPE, 'stderr': subprocess.PIPE, 'text': True,
+                           'errors': 'replace'}
+        self.stderr = Lines()
+        self.stdout = Lines()
+        self.stats = ItemizeStats()
         self.returncode = None
         self.short_out = ""
+        self.name = 'rsync'
+        # None: taken from [rsync] outfile and changes
+        self.outfile = None
+        self.changes = None
+        self.changed = None
+        # (kind of target, options) with [rsync] transfer = auto
+        self.transfer = None
+        self.progress = int(self.config.get('progress', 60))
         self.sudo()
 
     @property
@@ -34,23 +101,70 @@ class RSync:
     def run(self, sources=None, target=""):
         if sources is None:
             sources = [""]
-        rsync_args = [*self.exe_args, *self.options, *sources, target]
+        if self.config.get('transfer', '') == 'auto' and self.transfer is None:
+            self.transfer = Transfer.choose(target)
+        transfer_options = self.transfer[1] if self.transfer else []
+        rsync_args = [*self.exe_args, *self.options, *transfer_options, *sources, target]
         rlog.debug("Executing '%s'", "' '".join(rsync_args))
-        with subprocess.Popen(rsync_args, **self.popen_args) as proc:
-            rlog.info("rsync is running...")
-            (out, err) = proc.communicate()
+        outfile = self.outfile
+        if outfile is None:
+            outfile = datetime.datetime.now().strftime(self.config.get('outfile', ''))
+        changes = self.changes if self.changes is not None else self.config.get('changes', '')
+        start = time.monotonic()
+        with subprocess.Popen(rsync_args, **self.popen_args) as proc, \
+                contextlib.ExitStack() as files:
+            rlog.info("%s is running...", self.name)
+            if proc.stdin:
+                proc.stdin.close()
+            errors = threading.Thread(target=self._read, args=(proc.stderr, self.stderr, 'error'))
+            errors.start()
+            out = None
+            if outfile:
+                out = files.enter_context(Path(outfile).open("w+", encoding='utf-8'))
+            if changes:
+                # appended, as paths which have not been staged yet must stay:
+                self.changed = files.enter_context(
+                    Path(changes).open("a", encoding='utf-8', errors='surrogateescape'))
+            self._read(proc.stdout, self.stdout, 'output', out)
+            errors.join()
             proc.wait()
-            rlog.info("rsync has finished.")
-        self.stdout = out.strip().split('\n')
-        self.stderr = err.strip().split('\n')
+            rlog.info("%s has finished.", self.name)
+        self.changed = None
         self.returncode = proc.returncode
-        self.short_out = f"{self.out_len} output lines"
+        self.stats.seconds = time.monotonic() - start
+        if outfile:
+            with Path(outfile).open("a", encoding='utf-8') as out:
+                out.write(f"# {self.name}: {self.stats}\n")
+        self.short_out = f"output in {outfile}" if outfile else f"{self.out_len} output lines"
+
+    def _read(self, stream, lines, name, out=None):
+        """Takes the lines from stream as they arrive, writing them to out.
+        Progress is reported while reading the output."""
+        debug = rlog.isEnabledFor(logging.DEBUG)
+        next_report = time.monotonic() + self.progress
+        for line in stream:
+            if out is not None:
+                out.write(line)
+            line = line.rstrip('\n')
+            lines.add(line)
+            if lines is self.stdout:
+                kind, path = self.stats.add(line)
+                # directories themselves do not matter to git:
+                if kind is not None and self.changed is not None and not path.endswith('/'):
+                    self.changed.write(unescape(path) + '\0')
+            if debug:
+                rlog.debug("%s: %s", name, line)
+            if lines is self.stdout and self.progress and time.monotonic() > next_report:
+                rlog.info("%s is running, %d output lines, %d error lines so far",
+                          self.name, self.out_len, self.err_len)
+                next_report = time.monotonic() + self.progress
 
     def fill_options(self):
         self.options.extend(self.config.get('options', '').split())
         self.options.append('--partial')
         self.options.append('--verbose')
         self.options.append('--itemize-changes')
+        self.options.append('--stats')
         self.options.append('--archive')
         if self.config.get('no_cross', '') == '-x':
             self.options.append('--one-file-system')
@@ -71,33 +185,17 @@ class RSync:
         self.exe_args.insert(0, 'sudo')
         self.popen_args['stdin'] = subprocess.PIPE
 
-    def report_output(self):
-        rlog.debug("output: ##############")
-        for x in self.stdout:
-            rlog.debug(x)
-        rlog.debug("error: ###############")
-        for x in self.stderr:
-            rlog.debug(x)
-        rlog.debug("######################")
-
-    def save_output(self):
-        outfile = datetime.datetime.now().strftime(self.config.get('outfile', ''))
-        if outfile:
-            with Path(outfile).open("w+", encoding='utf-8') as out:
-                out.write('\n'.join(self.stdout))
-            self.short_out = f"output in {outfile}"
-
     def notify_result(self):
-        rlog.info("RSYNC done, exit code %d, %d log lines, %d error lines",
-                  self.returncode, self.out_len, self.err_len)
+        rlog.info("RSYNC done, exit code %d, %d log lines, %d error lines, %s",
+                  self.returncode, self.out_len, self.err_len, self.stats)
         error = ' '.join(self.stderr)
         code = f'{self.returncode}\n{error}'
         if self.returncode == 0:
-            Notify.get().success('\n'.join([self.short_out, error]))
+            Notify.get().success('\n'.join([self.short_out, f"rsync: {self.stats}", error]))
         elif self.returncode in (23, 24):
             Notify.get().success('\n'.join([
                 f"Nicht alle Quelldateien konnten gelesen werden {self.returncode}",
-                self.short_out, error
+                self.short_out, f"rsync: {self.stats}", error
                 ]))
         elif self.returncode == 20:
             Notify.get().abort('\n'.join(
@@ -112,6 +210,178 @@ class RSync:
             Notify.get().fail(f"Unknown rsync error {code}")
 
     def wrapup(self):
-        self.save_output()
         self.notify_result()
-        self.report_output()
+        if self.transfer:
+            Transfer.remember(self.transfer[0], self.stats)
+
+
+class Unit:
+    """What one of the rsyncs of a ParallelRSync copies: paths to target with
+    additional options. keys name the parts whose durations are remembered."""
+    # pylint: disable=too-few-public-methods,too-many-arguments
+    def __init__(self, name, paths, target, options=(), keys=(), weight=0.0):
+        self.name = name
+        self.paths = paths
+        self.target = target
+        self.options = list(options)
+        self.keys = list(keys)
+        self.weight = weight
+
+
+class ParallelRSync(RSync):
+    """Runs one rsync per source, at most workers at a time. The sources which
+    took longest last time are started first.
+
+    With shards > 1, a local source directory is split into up to shards
+    groups of its top-level directories, which are copied by rsyncs of their
+    own using --relative. Afterwards, another rsync copies the top level of
+    the source without recursion; this copies the top-level files and, with
+    --delete, removes top-level entries which are gone from the source. All of
+    them transfer the same paths as one rsync of the source would, so that
+    anchored filter rules match the same files."""
+    def __init__(self, workers, shards=1):
+        super().__init__()
+        self.workers = workers
+        self.shards = shards
+
+    @classmethod
+    def separate(cls, sources):
+        """True if no two sources are copied into the same directory. A source
+        ending with / is copied into the target itself."""
+        if len(sources) > 1 and any(source.endswith('/') for source in sources):
+            return False
+        names = [os.path.basename(source) for source in sources]
+        return len(set(names)) == len(names)
+
+    def _directories(self, source):
+        """Names of the top-level directories of a local source, or []. With
+        --one-file-system, directories on other file systems are left out, as
+        they would be the sources of their rsyncs; the top-level rsync only
+        creates them, like one rsync of the source would."""
+        if ':' in source.split('/')[0] or not os.path.isdir(source):
+            return []
+        try:
+            with os.scandir(source) as entries:
+                directories = sorted(e.name for e in entries if e.is_dir(follow_symlinks=False))
+            if '--one-file-system' in self.options or '-x' in self.options:
+                device = os.stat(source).st_dev
+                directories = [d for d in directories
+                               if os.lstat(os.path.join(source, d)).st_dev == device]
+        except OSError as e:
+            rlog.warning("Cannot split %s: %s", source, e)
+            return []
+        return directories
+
+    def _shard(self, source, target, seconds):
+        """The units which copy the top-level directories of source and the
+        unit which copies its top level, or None if source cannot be split."""
+        directories = self._directories(source)
+        if len(directories) < 2:
+            return None
+        if source.endswith('/'):
+            base, prefix = source.rstrip('/') or '/', ''
+        else:
+            base, prefix = os.path.split(source)
+        known = [seconds[f"{source}/{d}"] for d in directories if f"{source}/{d}" in seconds]
+        guess = sum(known) / len(known) if known else 1.0
+        weights = {d: seconds.get(f"{source}/{d}", guess) for d in directories}
+        # the heaviest directory goes to the lightest group:
+        count = min(self.shards, len(directories))
+        groups = [[] for _ in range(count)]
+        loads = [0.0] * count
+        for d in sorted(directories, key=weights.get, reverse=True):
+            lightest = loads.index(min(loads))
+            groups[lightest].append(d)
+            loads[lightest] += weights[d]
+        units = [Unit(f"{source} [{i + 1}/{count}]",
+                      [os.path.join(base, '.', prefix, d) for d in group],
+                      target, ['--relative'], [f"{source}/{d}" for d in group], loads[i])
+                 for i, group in enumerate(groups)]
+        # the contents of source/ are copied as well by --dirs:
+        top = Unit(f"{source} top level", [os.path.join(base, '.', prefix, '')], target,
+                   ['--relative', '--no-recursive', '--dirs'])
+        return units, top
+
+    def _run_one(self, unit, outfile, changes):
+        rsync = RSync()
+        rsync.transfer = self.transfer
+        rsync.options.extend(unit.options)
+        rsync.name = f"rsync {unit.name}"
+        rsync.outfile = outfile
+        rsync.changes = changes
+        start = time.monotonic()
+        rsync.run(unit.paths, unit.target)
+        return rsync, time.monotonic() - start
+
+    def _run_all(self, units, parts, changes):
+        """Runs all units, at most workers at a time, and returns their rsyncs
+        and durations in the order of units."""
+        done = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._run_one, unit, part, changed)
+                       for unit, part, changed in zip(units, parts, changes)]
+            for future in concurrent.futures.as_completed(futures):
+                done += 1
+                if future.exception() is None:
+                    rlog.info("%s finished with exit code %d, %d of %d done",
+                              units[futures.index(future)].name,
+                              future.result()[0].returncode, done, len(units))
+        return [future.result() for future in futures]
+
+    def run(self, sources=None, target=""):
+        if not sources or not self.separate(sources) or (len(sources) < 2 and self.shards < 2):
+            rlog.info("Running one rsync for all sources")
+            super().run(sources, target)
+            return
+        outfile = datetime.datetime.now().strftime(self.config.get('outfile', ''))
+        start = time.monotonic()
+        if self.config.get('transfer', '') == 'auto':
+            self.transfer = Transfer.choose(target)
+        seconds = JobState.get('seconds', {})
+        units, tops = [], []
+        for source in sources:
+            sharded = self._shard(source, target, seconds) if self.shards > 1 else None
+            if sharded is None:
+                # sources that have not been measured yet may be large as well:
+                units.append(Unit(source, [source], target, keys=[source],
+                                  weight=seconds.get(source, float('inf'))))
+            else:
+                units.extend(sharded[0])
+                tops.append(sharded[1])
+        units.sort(key=lambda unit: unit.weight, reverse=True)
+        parts = [f"{outfile}.{i}" if outfile else '' for i in range(len(units) + len(tops))]
+        changes = self.config.get('changes', '')
+        changed = [f"{changes}.{i}" if changes else '' for i in range(len(parts))]
+        rlog.info("Running up to %d rsyncs at a time for %d parts", self.workers, len(units))
+        results = self._run_all(units, parts, changed)
+        # the top levels are only copied when everything below them is there:
+        results += self._run_all(tops, parts[len(units):], changed[len(units):])
+        self.returncode = 0
+        for unit, (rsync, duration) in zip(units + tops, results):
+            self.stdout.merge(rsync.stdout)
+            self.stderr.merge(rsync.stderr)
+            self.stats.merge(rsync.stats)
+            if severity(rsync.returncode) > severity(self.returncode):
+                self.returncode = rsync.returncode
+            if severity(rsync.returncode) <= 1:
+                for key in unit.keys:
+                    seconds[key] = round(duration / len(unit.keys), 1)
+        JobState.update('seconds', seconds)
+        self.stats.seconds = time.monotonic() - start
+        if changes:
+            self._join(changes, changed, 'a')
+        if outfile:
+            self._join(outfile, parts)
+            with Path(outfile).open("a", encoding='utf-8') as out:
+                out.write(f"# total: {self.stats}\n")
+            self.short_out = f"output in {outfile}"
+        else:
+            self.short_out = f"{self.out_len} output lines"
+
+    @classmethod
+    def _join(cls, outfile, parts, mode='w'):
+        with Path(outfile).open(mode, encoding='utf-8') as out:
+            for part in parts:
+                with Path(part).open(encoding='utf-8') as src:
+                    shutil.copyfileobj(src, out)
+                os.unlink(part)
@@ -0,0 +1,190 @@
+"""Rotation of a TaggedLog file into dated segments.
+
+When the log grows beyond a configured size, it is renamed to
+${file}.YYYYmmdd-HHMMSS and a new, empty log is started. Segments may be
+compressed with gzip. The manifest ${file}.segments keeps the date range
+and the number of lines per subject of every segment, so that queries can
+skip segments which cannot contain what they are looking for."""
+
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+from .logindex import split_line
+from .taggedentry import parse_date
+from .taggedlog import TaggedLog
+
+seglog = logging.getLogger(__name__)
+
+
+def parse_size(text):
+    """Size in bytes from a number with an optional suffix k, M or G."""
+    text = str(text).strip()
+    factor = 1
+    if text and text[-1].lower() in 'kmg':
+        factor = 1024 ** ('kmg'.index(text[-1].lower()) + 1)
+        text = text[:-1]
+    return int(float(text) * factor)
+
+
+class Segment(TaggedLog):
+    """A rotated part of a log. Segments are only read, so there is no text
+    file object and the time order is taken from the manifest."""
+    def __init__(self, log_file, info):
+        # pylint: disable=super-init-not-called
+        self.log_file = log_file
+        self.file_obj = None
+        self.raw = None
+        self.index = None
+        self.order = None
+        self.archive = None
+        self.info = info
+        self.data = None
+
+    def _open_binary(self):
+        if not self.info['compressed']:
+            return super()._open_binary()
+        if self.data is None:
+            with gzip.open(self.log_file, 'rb') as packed:
+                self.data = packed.read()
+        return io.BytesIO(self.data)
+
+    def _ordered_part(self):
+        return (0, '') if self.info['ordered'] else None
+
+    def _offset_range(self, opts):
+        # start_offset and end_offset refer to the current log, not to segments.
+        return self._date_range(opts)
+
+    def may_match(self, opts):
+        """False if this segment cannot contain any entry that matches opts."""
+        subjects = set(self.info['subjects'])
+        if opts['subjects'] and not subjects.intersection(opts['subjects']):
+            return False
+        if not subjects.difference(opts['exclude']):
+            return False
+        # undated lines are taken to be from now, so they can match any date:
+        if self.info['undated'] or not self.info['first']:
+            return True
+        if opts['since'] > parse_date(self.info['last']):
+            return False
+        if opts['until'] < parse_date(self.info['first']):
+            return False
+        return True
+
+
+class Manifest:
+    suffix = '.segments'
+
+    def __init__(self, log_file):
+        self.log_file = Path(log_file)
+        self.path = Path(str(log_file) + self.suffix)
+        self.segments = []
+        self.objects = {}
+        self.load()
+
+    def __bool__(self):
+        return bool(self.segments)
+
+    def load(self):
+        try:
+            with self.path.open(encoding='utf-8') as manifest:
+                self.segments = json.load(manifest)['segments']
+        except FileNotFoundError:
+            self.segments = []
+        except (OSError, ValueError, KeyError) as e:
+            seglog.warning("Ignoring unusable %s: %s", self.path, e)
+            self.segments = []
+
+    def save(self):
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with tmp.open('w', encoding='utf-8') as manifest:
+            json.dump({'segments': self.segments}, manifest, indent=1)
+        os.replace(tmp, self.path)
+
+    def _segment(self, info):
+        if info['file'] not in self.objects:
+            path = self.log_file.with_name(info['file'])
+            self.objects[info['file']] = Segment(path, info)
+        return self.objects[info['file']]
+
+    def matching(self, opts):
+        """The segments that may contain entries matching opts, oldest first.
+        Queries which are limited by offsets only concern the current log."""
+        if opts['start_offset'] > 0:
+            return []
+        return [seg for seg in map(self._segment, self.segments) if seg.may_match(opts)]
+
+    @classmethod
+    def describe(cls, path):
+        """Manifest entry for the uncompressed segment at path."""
+        info = {'file': path.name,
+                'first': '',
+                'last': '',
+                'lines': 0,
+                'undated': 0,
+                'ordered': True,
+                'compressed': False,
+                'subjects': {},
+                }
+        with path.open('rb') as raw:
+            for line in raw:
+                date, subject = split_line(line)
+                info['lines'] += 1
+                info['subjects'][subject] = info['subjects'].get(subject, 0) + 1
+                if date is None:
+                    info['undated'] += 1
+                    info['ordered'] = False
+                    continue
+                if date < info['last']:
+                    info['ordered'] = False
+                info['first'] = min(date, info['first']) if info['first'] else date
+                info['last'] = max(date, info['last'])
+        return info
+
+    def rotate(self):
+        """Turns the log into a new segment and starts a new, empty log."""
+        path = self.log_file.with_name(f"{self.log_file.name}.{datetime.now():%Y%m%d-%H%M%S}")
+        counter = 0
+        while path.exists() or path.with_name(path.name + '.gz').exists():
+            counter += 1
+            path = path.with_name(f"{self.log_file.name}.{datetime.now():%Y%m%d-%H%M%S}-{counter}")
+        # readers must find a log at every moment, so the segment is linked first
+        # and an empty log replaces the old one afterwards:
+        empty = self.log_file.with_name(f".{self.log_file.name}.{os.getpid()}.new")
+        with empty.open('x', encoding='utf-8'):
+            pass
+        shutil.copymode(self.log_file, empty)
+        os.link(self.log_file, path)
+        os.replace(empty, self.log_file)
+        seglog.info("Rotated %s to %s", self.log_file, path)
+        # the index belongs to the old file, it would be rebuilt from scratch anyway:
+        for suffix in ('.idx', '.idx.subjects', '.order'):
+            try:
+                os.unlink(str(self.log_file) + suffix)
+            except FileNotFoundError:
+                pass
+        self.segments.append(self.describe(path))
+        self.save()
+
+    def compress(self, keep_plain=1):
+        """Compresses all but the newest keep_plain segments."""
+        plain = [info for info in self.segments if not info['compressed']]
+        for info in plain[:max(0, len(plain) - keep_plain)]:
+            path = self.log_file.with_name(info['file'])
+            packed = path.with_name(path.name + '.gz')
+            tmp = packed.with_name(packed.name + '.tmp')
+            with path.open('rb') as src, gzip.open(tmp, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp, packed)
+            info['file'] = packed.name
+            info['compressed'] = True
+            # the manifest must not point to a missing file at any time:
+            self.save()
+            os.unlink(path)
+            seglog.debug("Compressed %s", packed)
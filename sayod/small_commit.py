@@ -41,8 +41,8 @@ class SmallCommit:
     prog = 'smallcommit'
 
     @classmethod
-    def add_subparser(cls, sp):
-        ap = sp.add_parser(cls.prog, help="""Creates a small commit""")
+    def add_subparser(cls, sp, helptext):
+        ap = sp.add_parser(cls.prog, help=helptext)
         ap.add_argument('--add', '-a',
                         action='append',
                         required=False,
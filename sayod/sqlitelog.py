@@ -0,0 +1,176 @@
+"""Status log kept in an SQLite database instead of a text file.
+
+SqliteLog answers the same queries as TaggedLog. Entries are rows of a table
+with an index on (subject, date), so lookups do not need to read the whole
+log. The row id takes the role of the byte offset in TaggedLog, i.e.,
+start_offset and end_offset are row ids."""
+
+import datetime
+import logging
+import os
+import sqlite3
+
+from .taggedentry import TaggedEntry, parse_date
+
+sqlog = logging.getLogger(__name__)
+
+
+class SqliteLog:
+    schema = ("CREATE TABLE IF NOT EXISTS entries ("
+              "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+              "date TEXT NOT NULL, "
+              "subject TEXT NOT NULL, "
+              "content TEXT NOT NULL)",
+              "CREATE INDEX IF NOT EXISTS entries_subject_date ON entries (subject, date)",
+              )
+
+    def __init__(self, log_file, mode='r', **kwargs):
+        self.log_file = log_file
+        if self.log_file == "":
+            raise AttributeError("Cannot find out where log is kept")
+        if mode == 'r':
+            self.db = sqlite3.connect(f"file:{log_file}?mode=ro", uri=True, timeout=30)
+        else:
+            self.db = sqlite3.connect(log_file, timeout=30)
+            # SQLite syncs every transaction by default; without fsync, fewer syncs
+            # are made at the risk of losing the last entries on power loss.
+            if not kwargs.get('fsync', False):
+                self.db.execute("PRAGMA synchronous = NORMAL")
+            for statement in SqliteLog.schema:
+                self.db.execute(statement)
+            self.db.commit()
+
+    def __del__(self):
+        if getattr(self, 'db', None) is not None:
+            self.db.close()
+
+    @classmethod
+    def _options(cls, **kwargs):
+        opts = {'subjects': [],
+                'exclude': [],
+                'action': 'list',
+                'since': datetime.datetime.min,
+                'until': datetime.datetime.max,
+                'start_offset': 0,
+                'end_offset': None,
+                }
+        opts.update(kwargs)
+        opts['subjects'] = list(opts['subjects'])
+        if 'subject' in kwargs and kwargs['subject'] not in opts['subjects']:
+            opts['subjects'].append(kwargs['subject'])
+        opts['action'] = opts['action'].lower()
+        return opts
+
+    @classmethod
+    def _where(cls, opts):
+        clauses, params = [], []
+        if opts['since'] != datetime.datetime.min:
+            since = opts['since']
+            # dates are stored without fractions of seconds:
+            if since.microsecond:
+                since = since.replace(microsecond=0) + datetime.timedelta(seconds=1)
+            clauses.append("date >= ?")
+            params.append(f"{since:{TaggedEntry.timeformat}}")
+        if opts['until'] != datetime.datetime.max:
+            clauses.append("date <= ?")
+            params.append(f"{opts['until']:{TaggedEntry.timeformat}}")
+        if opts['subjects']:
+            clauses.append(f"subject IN ({', '.join('?' * len(opts['subjects']))})")
+            params.extend(opts['subjects'])
+        if opts['exclude']:
+            clauses.append(f"subject NOT IN ({', '.join('?' * len(opts['exclude']))})")
+            params.extend(opts['exclude'])
+        if opts['start_offset']:
+            clauses.append("id >= ?")
+            params.append(opts['start_offset'])
+        if opts['end_offset'] is not None:
+            clauses.append("id < ?")
+            params.append(opts['end_offset'])
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    @classmethod
+    def _entry(cls, row):
+        entry = TaggedEntry(row[3], row[2])
+        entry.date = parse_date(row[1])
+        return entry
+
+    def _rows(self, opts, order="id", limit=None):
+        where, params = self._where(opts)
+        query = f"SELECT id, date, subject, content FROM entries{where} ORDER BY {order}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return self.db.execute(query, params)
+
+    def find_iter(self, **kwargs):
+        """Yields the matching entries in log order, one at a time. action is
+        ignored."""
+        opts = self._options(**kwargs)
+        sqlog.debug("SqliteLog iterates over %s", opts['subjects'])
+        for row in self._rows(opts):
+            yield self._entry(row)
+
+    def _find_rows(self, opts):
+        if opts['action'] == 'last':
+            return list(self._rows(opts, "id DESC", 1))
+        if opts['action'] == 'first':
+            return list(self._rows(opts, "id", 1))
+        return list(self._rows(opts))
+
+    def find(self, **kwargs):
+        opts = self._options(**kwargs)
+        sqlog.debug("SqliteLog looks for %s in %s", opts['action'], opts['subjects'])
+        if opts['action'] == 'count':
+            where, params = self._where(opts)
+            return [self.db.execute(f"SELECT count(*) FROM entries{where}", params).fetchone()[0]]
+        entries = [self._entry(row) for row in self._find_rows(opts)]
+        if opts['action'] == 'last':
+            return [entries[0] if entries else None]
+        return entries
+
+    def find_batch(self, queries):
+        """Same as TaggedLog.find_batch: a query with 'after' only considers
+        entries since the date of the one found by the earlier 'last' query."""
+        results = {}
+        found = {}
+        for qid, kwargs in queries.items():
+            opts = self._options(**kwargs)
+            ref = opts.get('after', None)
+            if ref is not None:
+                if ref not in found:
+                    raise ValueError(f"Query {qid} must follow an earlier 'last' query, not {ref}")
+                if found[ref] is not None:
+                    opts['since'] = max(opts['since'], found[ref].date)
+            if opts['action'] == 'count':
+                results[qid] = self.find(**opts)
+                continue
+            rows = self._find_rows(opts)
+            results[qid] = [self._entry(row) for row in rows]
+            if opts['action'] == 'last':
+                results[qid] = results[qid] or [None]
+                found[qid] = results[qid][0]
+        return results
+
+    def find_one(self, **kwargs):
+        f = self.find(**kwargs)
+        if f:
+            return f[0]
+        return None
+
+    def position(self):
+        """(identity, end): end is the row id the next entry will get at least."""
+        last = self.db.execute("SELECT max(id) FROM entries").fetchone()[0]
+        return os.stat(self.log_file).st_ino, (last or 0) + 1
+
+    def append_many(self, entries):
+        """Appends all entries in one transaction and returns their number."""
+        with self.db:
+            cursor = self.db.executemany(
+                "INSERT INTO entries (date, subject, content) VALUES (?, ?, ?)",
+                ((f"{e.date:{TaggedEntry.timeformat}}", e.subject.upper(), e.content)
+                 for e in entries))
+        return cursor.rowcount
+
+    def append(self, new_entry):
+        self.append_many([new_entry])
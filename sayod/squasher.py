@@ -71,8 +71,9 @@ class _Squasher:
         with orig_todo_file.open() as rebase_plan_file:
             for line in rebase_plan_file:
                 self.handle_line(line, rebase_plan)
-        for item in rebase_plan:
-            slog.debug("Rebase plan: %s", item)
+        if slog.isEnabledFor(logging.DEBUG):
+            for item in rebase_plan:
+                slog.debug("Rebase plan: %s", item)
         with new_todo_file.open('w') as new_plan:
             new_plan.write('\n'.join(rebase_plan))
 
@@ -122,11 +123,8 @@ class Squasher:
     prog = 'squasher'
 
     @classmethod
-    def add_subparser(cls, sp):
-        ap = sp.add_parser(cls.prog,
-                           help='''Integrates commits from a given time period into one commit,
-                                   rebasing newer commits onto them.'''
-                           )
+    def add_subparser(cls, sp, helptext):
+        ap = sp.add_parser(cls.prog, help=helptext)
         ap.add_argument('--scope', choices='monthly weekly daily'.split(), required=True,
                         help="""The time period whose commits will be squashed""")
         ap.add_argument('--keep-previous', action=argparse.BooleanOptionalAction, default=None,
@@ -0,0 +1,77 @@
+"""One SSH connection per job, shared by all commands that are run on the
+notification host.
+
+Before the first command, a ControlMaster connection is started in the
+background; all commands reuse it and do not need to authenticate again. The
+master is told to exit when the job ends (close()), or after ControlPersist
+seconds if that never happens."""
+
+import logging
+import shutil
+import tempfile
+import threading
+from subprocess import run, DEVNULL
+
+sshlog = logging.getLogger(__name__)
+
+
+class SshSession:
+    def __init__(self, user, host, port, **kwargs):
+        self.user = user
+        self.host = host
+        self.port = port
+        self.multiplex = kwargs.get('multiplex', True)
+        self.persist = kwargs.get('persist', 600)
+        self.control_dir = None
+        # notifications may be sent from another thread:
+        self.lock = threading.Lock()
+
+    def _destination(self):
+        return ['-l', self.user, self.host, '-p', self.port]
+
+    def _start(self):
+        self.control_dir = tempfile.mkdtemp(prefix='sayod-ssh-')
+        # %C is a hash of host, port and user, which keeps the socket path short.
+        path = f"{self.control_dir}/%C"
+        sshlog.debug("Starting ssh master connection to %s in %s", self.host, self.control_dir)
+        # the master must not keep the pipes of the first command open, so it is
+        # started on its own:
+        master = run(['ssh', '-M', '-N', '-f',
+                      '-o', f'ControlPath={path}',
+                      '-o', f'ControlPersist={self.persist}',
+                      *self._destination()],
+                     check=False, stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL)
+        if master.returncode != 0:
+            sshlog.warning("Cannot start ssh master connection to %s, connecting each time",
+                           self.host)
+            shutil.rmtree(self.control_dir, ignore_errors=True)
+            self.control_dir = None
+            self.multiplex = False
+
+    def options(self):
+        with self.lock:
+            if self.multiplex and self.control_dir is None:
+                self._start()
+        if not self.multiplex:
+            return []
+        return ['-o', 'ControlMaster=no',
+                '-o', f'ControlPath={self.control_dir}/%C']
+
+    def command(self, remote_command):
+        """Argument list for running remote_command on the host."""
+        return ['ssh', *self.options(), *self._destination(), remote_command]
+
+    def close(self):
+        """Stops the master connection, if one has been started."""
+        with self.lock:
+            self._close()
+
+    def _close(self):
+        if self.control_dir is None:
+            return
+        sshlog.debug("Closing ssh connection to %s", self.host)
+        run(['ssh', '-o', f'ControlPath={self.control_dir}/%C', '-O', 'exit',
+             *self._destination()],
+            check=False, stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL)
+        shutil.rmtree(self.control_dir, ignore_errors=True)
+        self.control_dir = None
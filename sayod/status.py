@@ -0,0 +1,96 @@
+"""Opens the status log configured in [status]"""
+
+import fcntl
+import logging
+import os
+
+from .config import Config
+from .segments import Manifest, parse_size
+from .sqlitelog import SqliteLog
+from .taggedlog import TaggedLog
+
+slog = logging.getLogger(__name__)
+
+# logs that are kept open between requests by the daemon: (file, mode) -> (stamp, log)
+_kept_logs = None
+
+
+def use_index():
+    return Config.get().find('status', 'index', 'no') in ('yes', 'ja', 'true')
+
+
+def backend():
+    return Config.get().find('status', 'backend', 'text')
+
+
+def status_file():
+    log_file = Config.get().find('status', 'file', None)
+    if not log_file:
+        slog.warning("Status file cannot be determined")
+        raise SystemExit(1)
+    return log_file
+
+
+def use_fsync():
+    return Config.get().find('status', 'fsync', 'no') in ('yes', 'ja', 'true')
+
+
+def _open_log(log_file, mode):
+    if backend() == 'sqlite':
+        return SqliteLog(log_file, mode, fsync=use_fsync())
+    return TaggedLog(log_file, mode, index=use_index(), archive=Manifest(log_file),
+                     fsync=use_fsync())
+
+
+def keep_logs_open():
+    global _kept_logs  # pylint: disable=global-statement
+    _kept_logs = {}
+
+
+def _stamp(log_file):
+    """Changes when the log is replaced or rotated."""
+    stamp = []
+    for path, with_time in ((log_file, False), (log_file + Manifest.suffix, True)):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_ino, st.st_mtime_ns if with_time else None))
+        except FileNotFoundError:
+            stamp.append(None)
+    return stamp
+
+
+def status_log(mode='r'):
+    log_file = status_file()
+    if _kept_logs is None:
+        return _open_log(log_file, mode)
+    key = (log_file, mode, backend(), use_index(), use_fsync())
+    stamp = _stamp(log_file)
+    if key not in _kept_logs or _kept_logs[key][0] != stamp:
+        _kept_logs[key] = (stamp, _open_log(log_file, mode))
+    return _kept_logs[key][1]
+
+
+def rotate_status():
+    """Starts a new segment of the status log if it has grown beyond [status]
+    rotate."""
+    limit = Config.get().find('status', 'rotate', '')
+    if not limit or backend() == 'sqlite':
+        return
+    log_file = status_file()
+    try:
+        if os.stat(log_file).st_size < parse_size(limit):
+            return
+        # writers wait while the file is renamed and open the new one afterwards:
+        with open(log_file, 'a', encoding='utf-8') as locked:
+            fcntl.flock(locked.fileno(), fcntl.LOCK_EX)
+            # somebody else may have rotated while we waited for the lock:
+            if os.fstat(locked.fileno()).st_ino != os.stat(log_file).st_ino \
+                    or os.fstat(locked.fileno()).st_size < parse_size(limit):
+                return
+            manifest = Manifest(log_file)
+            manifest.rotate()
+            # still locked, so that no other rotation changes the manifest meanwhile:
+            if Config.get().find('status', 'compress', 'no') in ('yes', 'ja', 'true'):
+                manifest.compress(int(Config.get().find('status', 'keep_plain', 1)))
+    except FileNotFoundError:
+        return
@@ -0,0 +1,67 @@
+"""Remembers the last success of this job locally, so that deadtime checks do
+not need to ask the remote log every time.
+
+Other machines may write successes for the same remote key, but those can
+only be newer than what is kept here. So a cached success which is still
+within the deadtime is a correct answer, while anything else must be asked
+from the remote log."""
+
+import datetime
+import json
+import logging
+import os
+
+from .config import Config, _Config
+from .taggedentry import TaggedEntry, parse_date
+
+sclog = logging.getLogger(__name__)
+
+
+class SuccessCache:
+    @classmethod
+    def path(cls):
+        ssh = {key: Config.get().find('notify', key, '')
+               for key in ('host', 'remotekey')}
+        if not ssh['remotekey']:
+            ssh['remotekey'] = Config.get().find('info', 'stripped_name', 'UNKNOWN')
+        return _Config.cachedir() / f"{ssh['remotekey']}@{ssh['host'] or 'localhost'}.success"
+
+    @classmethod
+    def ttl(cls):
+        return int(Config.get().find('rsync', 'deadtime_cache', 3600))
+
+    @classmethod
+    def load(cls):
+        """Date of the last success, if it has been stored less than ttl seconds
+        ago."""
+        if cls.ttl() <= 0:
+            return None
+        try:
+            with cls.path().open(encoding='utf-8') as cache:
+                data = json.load(cache)
+            stored = parse_date(data['stored'])
+            success = parse_date(data['success'])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            sclog.warning("Ignoring unusable %s: %s", cls.path(), e)
+            return None
+        age = datetime.datetime.now() - stored
+        if age < datetime.timedelta(0) or age.total_seconds() > cls.ttl():
+            sclog.debug("Cached success from %s has expired", stored)
+            return None
+        return success
+
+    @classmethod
+    def store(cls, success):
+        path = cls.path()
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp.open('w', encoding='utf-8') as cache:
+                json.dump({'success': f"{success:{TaggedEntry.timeformat}}",
+                           'stored': f"{datetime.datetime.now():{TaggedEntry.timeformat}}",
+                           }, cache)
+            os.replace(tmp, path)
+        except OSError as e:
+            sclog.warning("Cannot store last success in %s: %s", path, e)
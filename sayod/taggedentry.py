@@ -5,7 +5,20 @@ from textwrap import TextWrapper
 telog = logging.getLogger(__name__)
 
 
+def is_date(word):
+    """Tells whether word has the fixed width shape of TaggedEntry.timeformat"""
+    return (len(word) == 19 and word[4] == '-' and word[7] == '-' and word[10] == 'T'
+            and word[13] == ':' and word[16] == ':')
+
+
+def parse_date(word):
+    if is_date(word):
+        return datetime.datetime.fromisoformat(word)
+    return datetime.datetime.strptime(word, TaggedEntry.timeformat)
+
+
 class TaggedEntry:
+    __slots__ = ('date', 'subject', 'content')
     timeformat = '%Y-%m-%dT%H:%M:%S'
 
     def __init__(self, content, subject=None, date=None):
@@ -24,7 +37,7 @@ class TaggedEntry:
             else:
                 # at least three words:
                 try:
-                    self.date = datetime.datetime.strptime(words[0], TaggedEntry.timeformat)
+                    self.date = parse_date(words[0])
                     self.subject = words[1]
                     if len(words) > 2:
                         self.content = ' '.join(words[2:])
@@ -70,6 +83,36 @@ class TaggedEntry:
         return result
 
 
+class LazyEntry(TaggedEntry):
+    """TaggedEntry for a line from a log which is only parsed when date, subject or
+    content are accessed for the first time."""
+    __slots__ = ('line',)
+
+    def __init__(self, line):
+        self.line = line
+
+    def __getattr__(self, name):
+        # only called for slots that have not been set yet.
+        words = self.line.strip().split(' ', 2)
+        dated = len(words) > 1 and is_date(words[0])
+        if name == 'date':
+            self.date = datetime.datetime.now()
+            if dated:
+                try:
+                    self.date = datetime.datetime.fromisoformat(words[0])
+                except ValueError:
+                    pass
+            return self.date
+        if name == 'subject':
+            self.subject = words[1] if dated else words[0]
+            return self.subject
+        if name == 'content':
+            rest = words[2:] if dated else words[1:]
+            self.content = ' '.join(rest).replace('\\n', "\n")
+            return self.content
+        raise AttributeError(name)
+
+
 def _FromPlainLog(stream):
     result = TaggedEntry("")
     for line in stream:
@@ -81,6 +124,12 @@ def _FromPlainLog(stream):
     return result
 
 
+def FromBatch(stream):
+    """Entries of a text/x-plain-log-batch stream, which has one log line per
+    entry. The entries keep their dates."""
+    return [TaggedEntry(line) for line in stream if line.strip()]
+
+
 def FromStream(stream, content_type='text/x-plain-log'):
     if content_type == "text/x-plain-log":
         return _FromPlainLog(stream)
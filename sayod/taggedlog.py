@@ -1,73 +1,472 @@
 import datetime
+import fcntl
+import itertools
 import logging
-from .taggedentry import TaggedEntry
+import os
+from .logindex import LogIndex, LogOrder, raw_subject, split_line
+from .taggedentry import LazyEntry, parse_date
 
 tllog = logging.getLogger(__name__)
 
 
+class _BatchQuery:
+    """State of one query of TaggedLog.find_batch while the log is read
+    backwards."""
+    def __init__(self, opts, raw):
+        self.opts = opts
+        # subjects as bytes, see TaggedLog._raw_subjects:
+        self.raw = raw
+        # the entries found, backwards, or their number:
+        self.found = [0] if opts['action'] == 'count' else []
+        self.done = False
+        # queries which are 'after' this one:
+        self.dependents = []
+        # the date from which on a dependent takes entries, as in the log:
+        self.since = None
+        # offsets of the lines to read in the current file:
+        self.range = (0, None)
+
+    def reads(self, offset, line):
+        """Whether the line at offset is in range. The query is done once the
+        lines are before its range."""
+        start, end = self.range
+        if offset < start or self._before(line):
+            self.done = True
+            return False
+        return end is None or offset < end
+
+    def _before(self, line):
+        if self.since is None:
+            return False
+        date = split_line(line)[0]
+        # lines without date are taken to be from now:
+        return date is not None and date < self.since
+
+    def add(self, entry):
+        if self.opts['action'] == 'count':
+            self.found[0] += 1
+        elif self.opts['action'] == 'first':
+            self.found = [entry]
+        else:
+            self.found.append(entry)
+        if self.opts['action'] == 'last':
+            self.done = True
+            for dependent in self.dependents:
+                dependent.follow(entry.date)
+
+    def follow(self, date):
+        """Only takes entries since date into account from now on. As all
+        lines are in time order then, lines before date end the query."""
+        self.opts['since'] = max(self.opts['since'], date)
+        self.since = f"{self.opts['since']:%Y-%m-%dT%H:%M:%S}"
+
+    def result(self):
+        if self.opts['action'] == 'last':
+            return [self.found[0] if self.found else None]
+        if self.opts['action'] == 'count':
+            return self.found
+        return self.found[::-1]
+
+
 class TaggedLog:
-    def __init__(self, log_file, mode='r'):
+    def __init__(self, log_file, mode='r', **kwargs):
         self.log_file = log_file
         self.file_obj = None
+        self.raw = None
         if self.log_file == "":
             raise AttributeError("Cannot find out where log is kept")
+        self.mode = mode
         self.file_obj = open(self.log_file, mode, encoding='utf-8')
+        # fsync after every append (or append_many) if True:
+        self.fsync = kwargs.get('fsync', False)
+        self.index = None
+        self.order = None
+        if kwargs.get('index', False):
+            self.index = LogIndex(self.log_file)
+            self.order = self.index
+        # older, rotated parts of the log (see segments.Manifest):
+        self.archive = kwargs.get('archive', None)
 
     def __del__(self):
         if self.file_obj is not None:
             self.file_obj.close()
+        if self.raw is not None:
+            self.raw.close()
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        return TaggedEntry(next(self.file_obj))
+        return LazyEntry(next(self.file_obj))
 
-    def _find(self, **kwargs):
+    @classmethod
+    def _options(cls, **kwargs):
         opts = {'subjects': [],
+                'exclude': [],
                 'ret': 'entry',
                 'action': 'list',
                 'since': datetime.datetime.min,
                 'until': datetime.datetime.max,
+                # only lines starting in [start_offset, end_offset) are read:
+                'start_offset': 0,
+                'end_offset': None,
                 }
         if kwargs is not None:
             for key, val in kwargs.items():
                 opts[key] = val
-            if 'subject' in kwargs:
+            opts['subjects'] = list(opts['subjects'])
+            if 'subject' in kwargs and kwargs['subject'] not in opts['subjects']:
                 opts['subjects'].append(kwargs['subject'])
         opts['action'] = opts['action'].lower()
+        return opts
+
+    @classmethod
+    def _matches(cls, entry, opts):
+        if entry.date < opts['since']:
+            return False
+        if opts['until'] < entry.date:
+            return False
+        if len(opts['subjects']) != 0 and entry.subject not in opts['subjects']:
+            return False
+        if entry.subject in opts['exclude']:
+            return False
+        return True
+
+    @classmethod
+    def _dated(cls, opts):
+        return opts['since'] != datetime.datetime.min or opts['until'] != datetime.datetime.max
+
+    @classmethod
+    def _raw_subjects(cls, opts):
+        return ({s.encode('utf-8') for s in opts['subjects']},
+                {s.encode('utf-8') for s in opts['exclude']})
+
+    @classmethod
+    def _raw_match(cls, subject, wanted, excluded):
+        if wanted and subject not in wanted:
+            return False
+        return subject not in excluded
+
+    @classmethod
+    def _entries(cls, lines, opts):
+        """Yields the matching entries from (offset, line) pairs. Lines are
+        filtered by their subject before they are parsed."""
+        wanted, excluded = cls._raw_subjects(opts)
+        for _, line in lines:
+            if not cls._raw_match(raw_subject(line), wanted, excluded):
+                continue
+            entry = LazyEntry(line.decode('utf-8'))
+            if cls._matches(entry, opts):
+                yield entry
+
+    def _open_binary(self):
+        return open(self.log_file, 'rb')
+
+    def _open_raw(self):
+        if self.raw is None:
+            self.raw = self._open_binary()
+        return self.raw
+
+    def _raw_line(self, offset):
+        self.raw.seek(offset, 0)
+        return self.raw.readline()
+
+    def _forward_lines(self, start=0, end=None):
+        """Yields (offset, line) pairs from start up to end (or EOF)."""
+        # own file object, so that other queries can run while this is consumed.
+        with self._open_binary() as raw:
+            raw.seek(start, 0)
+            offset = start
+            for line in raw:
+                if end is not None and offset >= end:
+                    return
+                yield offset, line
+                offset += len(line)
+
+    def _reverse_lines(self, end=None, block_size=1 << 16):
+        """Yields (offset, line) pairs from end (or EOF) to the start of the log."""
+        raw = self._open_raw()
+        pos = raw.seek(0, 2) if end is None else end
+        buf = b''
+        while pos > 0:
+            start = max(0, pos - block_size)
+            raw.seek(start, 0)
+            buf = raw.read(pos - start) + buf
+            pos = start
+            # all but the first line in buf are complete now:
+            end = len(buf)
+            nl = buf.rfind(b'\n', 0, end - 1)
+            while nl >= 0:
+                yield pos + nl + 1, buf[nl + 1:end]
+                end = nl + 1
+                nl = buf.rfind(b'\n', 0, end - 1)
+            buf = buf[:end]
+        if buf:
+            yield 0, buf
+
+    @classmethod
+    def _line_date(cls, line):
+        date, _ = split_line(line)
+        if date is None:
+            return None
+        try:
+            return parse_date(date)
+        except ValueError:
+            return None
+
+    def _line_start(self, pos):
+        """Offset of the first line that starts at or after pos."""
+        if pos == 0:
+            return 0
+        self.raw.seek(pos - 1, 0)
+        self.raw.readline()
+        return self.raw.tell()
+
+    def _dated_line(self, pos):
+        """(offset, date) of the first dated line starting at or after pos. date is
+        None if there is no such line."""
+        self.raw.seek(self._line_start(pos), 0)
+        while True:
+            offset = self.raw.tell()
+            line = self.raw.readline()
+            if not line:
+                return offset, None
+            date = self._line_date(line)
+            if date is not None:
+                return offset, date
+
+    def _ordered_part(self):
+        """(offset, date): the lines from offset on are in time order and none of
+        them is older than date, the latest date before offset. None if no part
+        of the log is known to be in order. Only lines that have been appended
+        since the last check need to be read."""
+        if self.order is None:
+            self.order = LogOrder(self.log_file)
+        self.order.update(self._open_raw())
+        return self.order.ordered_from, self.order.before
+
+    def _ordered(self):
+        """Checks whether all lines are in time order."""
+        part = self._ordered_part()
+        return part is not None and part[0] == 0
+
+    def _bisect(self, date, lo=0, after=False):
+        """Offset of the first line from lo on which is newer than date (after=True)
+        or not older than date (after=False). Lines from lo on must be in time
+        order."""
+        hi = self._open_raw().seek(0, 2)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            _, found = self._dated_line(mid)
+            if found is None or found > date or (found == date and not after):
+                hi = mid
+            else:
+                lo = mid + 1
+        return self._line_start(lo)
+
+    def _date_range(self, opts):
+        """(start, end) offsets of the lines that may lie between since and
+        until. (0, None) means the whole log needs to be read."""
+        start, end = 0, None
+        if not self._dated(opts):
+            return start, end
+        part = self._ordered_part()
+        if part is None:
+            tllog.info("%s is not in time order, reading all lines", self.log_file)
+            return start, end
+        ordered_from, before = part
+        if ordered_from > 0:
+            tllog.info("%s is in time order from %d on", self.log_file, ordered_from)
+        # lines before ordered_from are only skipped if all of them are too old:
+        if opts['since'] != datetime.datetime.min and f"{opts['since']:%Y-%m-%dT%H:%M:%S}" > before:
+            start = self._bisect(opts['since'], ordered_from)
+        if opts['until'] != datetime.datetime.max:
+            end = self._bisect(opts['until'], ordered_from, after=True)
+        return start, end
+
+    def _offset_range(self, opts):
+        """(start, end) offsets of the lines that need to be read for opts. end is
+        None for EOF."""
+        start, end = self._date_range(opts)
+        start = max(start, opts['start_offset'])
+        if opts['end_offset'] is not None:
+            end = opts['end_offset'] if end is None else min(end, opts['end_offset'])
+        return start, end
+
+    def _indexed_lines(self, opts, span, reverse=False):
+        """(offset, line) pairs of the lines with the subjects in opts within the
+        offsets span, as taken from the index. None if the index cannot help."""
+        self.index.update(self._open_raw())
+        offsets = self.index.offsets(opts['subjects'], opts['exclude'], span, reverse)
+        if offsets is None:
+            return None
+        return ((offset, self._raw_line(offset)) for offset in offsets)
+
+    def _lines(self, opts, reverse=False):
+        """(offset, line) pairs of all lines that may match opts, in log order or
+        reversed."""
+        start, end = self._offset_range(opts)
+        if self.index is not None:
+            lines = self._indexed_lines(opts, (start, end), reverse)
+            if lines is not None:
+                return lines
+        if reverse:
+            return itertools.takewhile(lambda pair: pair[0] >= start, self._reverse_lines(end))
+        return self._forward_lines(start, end)
+
+    def _segments(self, opts):
+        """Rotated segments which may contain matches for opts, oldest first."""
+        if not self.archive:
+            return []
+        return self.archive.matching(opts)
+
+    def find_iter(self, **kwargs):
+        """Yields the matching entries in log order, one at a time. action is
+        ignored."""
+        opts = self._options(**kwargs)
+        tllog.debug("TaggedLog iterates over %s", opts['subjects'])
+        for segment in self._segments(opts):
+            yield from segment.find_iter(**opts)
+        yield from self._entries(self._lines(opts), opts)
+
+    def find_here(self, opts):
+        """What find() returns for opts (see _options), from this file only,
+        without rotated segments."""
+        if opts['action'] == 'count' and self.index is not None and not self._dated(opts) \
+                and opts['start_offset'] == 0 and opts['end_offset'] is None:
+            self.index.update(self._open_raw())
+            offsets = self.index.offsets(opts['subjects'], opts['exclude'])
+            if offsets is not None:
+                return [sum(1 for _ in offsets)]
+        entries = self._entries(self._lines(opts, opts['action'] == 'last'), opts)
+        if opts['action'] == 'last':
+            return [next(entries, None)]
+        if opts['action'] == 'first':
+            return list(itertools.islice(entries, 1))
+        if opts['action'] == 'count':
+            return [sum(1 for _ in entries)]
+        return list(entries)
+
+    def find(self, **kwargs):
+        opts = self._options(**kwargs)
         tllog.debug("TaggedLog looks for %s in %s", opts['action'], opts['subjects'])
-        result = []
+        segments = self._segments(opts)
+        if not segments:
+            return self.find_here(opts)
+        tllog.debug("TaggedLog also reads %d segments", len(segments))
+        sources = segments + [self]
         if opts['action'] == 'last':
-            result.append(None)
+            for source in reversed(sources):
+                found = source.find_here(opts)
+                if found[0] is not None:
+                    return found
+            return [None]
+        if opts['action'] == 'first':
+            for source in sources:
+                found = source.find_here(opts)
+                if found:
+                    return found
+            return []
         if opts['action'] == 'count':
-            result.append(0)
-        for entry in self:
-            if entry.date < opts['since']:
-                continue
-            if opts['until'] < entry.date:
+            return [sum(source.find_here(opts)[0] for source in sources)]
+        return [entry for source in sources for entry in source.find_here(opts)]
+
+    @classmethod
+    def _batch_options(cls, queries):
+        batch = {qid: cls._options(**kwargs) for qid, kwargs in queries.items()}
+        seen = []
+        for qid, opts in batch.items():
+            ref = opts.get('after', None)
+            if ref is not None and (ref not in seen or batch[ref]['action'] != 'last'):
+                raise ValueError(f"Query {qid} must follow an earlier 'last' query, not {ref}")
+            seen.append(qid)
+        return batch
+
+    def _find_batch_each(self, batch):
+        """Answers the queries of batch one after the other."""
+        results = {}
+        for qid, opts in batch.items():
+            ref = opts.get('after', None)
+            if ref is not None and results[ref][0] is not None:
+                opts['since'] = max(opts['since'], results[ref][0].date)
+            results[qid] = self.find(**opts)
+        return results
+
+    def batch_pass(self, queries):
+        """One backwards pass over this log for the _BatchQuery objects in
+        queries, in the order of their batch, which are not done yet."""
+        queries = [query for query in queries if not query.done]
+        if not queries:
+            return
+        for query in queries:
+            query.range = self._offset_range(query.opts)
+        ends = [query.range[1] for query in queries]
+        end = None if None in ends else max(ends)
+        # dependents need to see a line before the query they follow is done:
+        queries.reverse()
+        for offset, line in self._reverse_lines(end):
+            self._take(queries, offset, line)
+            if all(query.done for query in queries):
+                break
+
+    def _take(self, queries, offset, line):
+        """Adds the line at offset to the queries it matches."""
+        subject = raw_subject(line)
+        entry = None
+        for query in queries:
+            if query.done or not query.reads(offset, line):
                 continue
-            if len(opts['subjects']) != 0 and entry.subject not in opts['subjects']:
+            if not self._raw_match(subject, *query.raw):
                 continue
-            # we've got a match!
-            if opts['action'] == 'count':
-                result[0] += 1
-            if opts['action'] == 'first':
-                return [entry]
-            if opts['action'] == 'last':
-                result[0] = entry
-            if opts['action'] == 'list':
-                result.append(entry)
-        return result
+            if entry is None:
+                entry = LazyEntry(line.decode('utf-8'))
+            if self._matches(entry, query.opts):
+                query.add(entry)
 
-    def find(self, **kwargs):
-        # store current position so that we don't interfere with
-        # iteration:
-        old_position = self.file_obj.tell()
-        self.file_obj.seek(0, 0)
-        result = self._find(**kwargs)
-        self.file_obj.seek(old_position, 0)
-        return result
+    def _find_batch_reverse(self, batch):
+        queries = {qid: _BatchQuery(opts, self._raw_subjects(opts))
+                   for qid, opts in batch.items()}
+        for qid, opts in batch.items():
+            if 'after' in opts:
+                queries[opts['after']].dependents.append(queries[qid])
+        queries = list(queries.values())
+        self.batch_pass(queries)
+        if self.archive:
+            # queries that did not need the start of this log do not need older
+            # segments either:
+            for query in queries:
+                if self._offset_range(query.opts)[0] > 0:
+                    query.done = True
+            for segment in reversed(self.archive.matching(self._options())):
+                if all(query.done for query in queries):
+                    break
+                segment.batch_pass([query for query in queries if segment.may_match(query.opts)])
+        return {qid: query.result() for qid, query in zip(batch, queries)}
+
+    def _all_ordered(self):
+        """Whether this log and all of its rotated segments are in time order."""
+        segments = self.archive.matching(self._options()) if self.archive else []
+        return self._ordered() and all(segment.info['ordered'] for segment in segments)
+
+    def find_batch(self, queries):
+        """Answers several queries at once. queries maps an id to the arguments of
+        find(); the result maps the same ids to what find() would return. A query
+        may have the id of an earlier query with action 'last' in 'after', then it
+        only takes entries into account which are at least as new as the entry
+        found by that query, i.e., since its date. This includes entries of the
+        same second which have been written before it. If that query found
+        nothing, 'after' does not restrict anything.
+
+        Without an index, this is one backwards pass over the log and then over
+        its rotated segments which stops as soon as all queries are answered."""
+        batch = self._batch_options(queries)
+        tllog.debug("TaggedLog answers %d queries at once", len(batch))
+        if self.index is not None and all(o['subjects'] or o['exclude'] for o in batch.values()):
+            return self._find_batch_each(batch)
+        if any('after' in o for o in batch.values()) and not self._all_ordered():
+            # entries after the one found may be older than it:
+            return self._find_batch_each(batch)
+        return self._find_batch_reverse(batch)
 
     def find_one(self, **kwargs):
         f = self.find(**kwargs)
@@ -75,6 +474,48 @@ class TaggedLog:
             return f[0]
         return None
 
+    def position(self):
+        """(identity, end) of the log: the inode and the offset up to which it
+        has been written."""
+        st = os.stat(self.log_file)
+        return st.st_ino, st.st_size
+
+    def _lock(self):
+        """Locks the log file for writing. If the log has been rotated while
+        waiting for the lock, the new log file is opened and locked instead."""
+        while True:
+            fcntl.flock(self.file_obj.fileno(), fcntl.LOCK_EX)
+            try:
+                if os.stat(self.log_file).st_ino == os.fstat(self.file_obj.fileno()).st_ino:
+                    return
+            except FileNotFoundError:
+                pass
+            tllog.debug("%s has been rotated, reopening it", self.log_file)
+            self.file_obj.close()
+            self.file_obj = open(self.log_file, self.mode, encoding='utf-8')
+            if self.raw is not None:
+                self.raw.close()
+                self.raw = None
+
+    def append_many(self, entries):
+        """Appends all entries with one write while holding the lock and returns
+        their number."""
+        lines = [f"{entry}\n" for entry in entries]
+        if not lines:
+            return 0
+        text = ''.join(lines)
+        self._lock()
+        try:
+            self.file_obj.seek(0, 2)
+            self.file_obj.write(text)
+            self.file_obj.flush()
+            if self.fsync:
+                os.fsync(self.file_obj.fileno())
+        finally:
+            fcntl.flock(self.file_obj.fileno(), fcntl.LOCK_UN)
+        if self.index is not None:
+            self.index.update(self._open_raw())
+        return len(lines)
+
     def append(self, new_entry):
-        self.file_obj.seek(0, 2)
-        self.file_obj.write(str(new_entry) + "\n")
+        self.append_many([new_entry])
@@ -0,0 +1,97 @@
+"""Choice of rsync's transfer options for [rsync] transfer = auto.
+
+Local disks and mounted file systems (FUSE, e.g. sshfs, or network file
+systems) get --whole-file: the delta algorithm would have to read the old
+file through the same slow path that it tries to save. Remote targets
+(host:path) keep delta transfer; they are compressed unless earlier runs
+of this job have sent more than [rsync] compress_below bytes per second,
+i.e., unless the network has not been the bottleneck."""
+
+import logging
+import os
+import re
+import statistics
+
+from .config import Config
+from .itemize import parse_number
+from .jobstate import JobState
+
+tlog = logging.getLogger(__name__)
+
+NETWORK_FS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'afs', 'ceph', 'glusterfs')
+# runs which sent less than this many bytes say little about the network:
+MIN_SENT = 10 * 1000 * 1000
+HISTORY = 5
+
+
+def is_remote(target):
+    if target.startswith('rsync://'):
+        return True
+    host, colon, _ = target.partition(':')
+    return bool(colon) and '/' not in host
+
+
+def mount_type(path):
+    """File system type of the mount which contains path, or None."""
+    path = os.path.realpath(path)
+    best, fstype = '', None
+    try:
+        with open('/proc/mounts', encoding='utf-8') as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # blanks and the like are written as \ooo:
+                point = re.sub(r'\\([0-7]{3})', lambda m: chr(int(m[1], 8)), fields[1])
+                inside = path == point or path.startswith(point.rstrip('/') + '/')
+                if inside and len(point) >= len(best):
+                    best, fstype = point, fields[2]
+    except OSError as e:
+        tlog.debug("Cannot read mounts: %s", e)
+    return fstype
+
+
+def target_kind(target):
+    """'remote', 'fuse', 'network' or 'local'."""
+    if is_remote(target):
+        return 'remote'
+    fstype = mount_type(target) or ''
+    if fstype.startswith('fuse'):
+        return 'fuse'
+    if fstype in NETWORK_FS:
+        return 'network'
+    return 'local'
+
+
+class Transfer:
+    @classmethod
+    def rates(cls):
+        return JobState.get('send_rates', [])
+
+    @classmethod
+    def choose(cls, target):
+        """(kind of target, additional rsync options)."""
+        kind = target_kind(target)
+        if kind != 'remote':
+            tlog.info("Transfer to %s target %s: whole files", kind, target)
+            return kind, ['--whole-file']
+        options = ['--no-whole-file']
+        limit = parse_number(Config.get().find('rsync', 'compress_below', '20M'))
+        rates = cls.rates()
+        if not rates or statistics.median(rates) < limit:
+            options.append('--compress')
+        else:
+            options.append('--no-compress')
+        tlog.info("Transfer to remote target %s: %s (earlier send rates %s)",
+                  target, ' '.join(options), rates or 'unknown')
+        return kind, options
+
+    @classmethod
+    def remember(cls, kind, stats):
+        """Keeps the send rate of a run to a remote target."""
+        sent = stats.bytes.get('sent', 0)
+        if kind != 'remote' or sent < MIN_SENT or stats.seconds <= 0:
+            return
+        rate = round(sent / stats.seconds)
+        tlog.debug("Sent %d bytes per second", rate)
+        JobState.update('send_rates', (cls.rates() + [rate])[-HISTORY:])
@@ -53,11 +53,8 @@ class ZippedGit:
     prog = 'zipped-git'
 
     @classmethod
-    def add_subparser(cls, sp):
-        return sp.add_parser(cls.prog,
-                             help='''Extracts the content of an archive file into a git repository
-                             and adds them.'''
-                             )
+    def add_subparser(cls, sp, helptext):
+        return sp.add_parser(cls.prog, help=helptext)
 
     @classmethod
     def standalone(cls, **_):
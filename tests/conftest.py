@@ -0,0 +1,27 @@
+"""Fixtures shared by the tests."""
+
+import pytest
+
+from sayod.config import Config
+
+
+@pytest.fixture(name='status_file')
+def fixture_status_file(tmp_path):
+    return tmp_path / 'status.log'
+
+
+@pytest.fixture(name='job')
+def fixture_job(tmp_path, monkeypatch):
+    """A function which writes the configuration of a job, initialises Config
+    with it (unless init is False) and returns its path. Caches and states are
+    kept in tmp_path."""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.setenv('XDG_STATE_HOME', str(tmp_path / 'state'))
+
+    def configure(text, init=True):
+        config = tmp_path / 'job.ini'
+        config.write_text(text, encoding='utf-8')
+        if init:
+            Config.init(configuration_file=str(config))
+        return config
+    return configure
@@ -0,0 +1,82 @@
+"""The analysis continues where the previous one has stopped, unless the log
+has been rotated or truncated since."""
+
+import datetime
+
+import pytest
+
+from sayod.analyse import Analyse
+from sayod.segments import Manifest
+from sayod.taggedlog import TaggedLog
+
+
+@pytest.fixture(name='analyse')
+def fixture_analyse(job, status_file, monkeypatch):
+    """A function which runs an analysis and returns the offset from which on it
+    has read the log and the mail it has written."""
+    job(f"[status]\nfile = {status_file}\n[mail]\ntype = echo\n")
+    starts = []
+    find_batch = TaggedLog.find_batch
+
+    def spy(self, queries):
+        starts.append(queries['success']['start_offset'])
+        return find_batch(self, queries)
+    monkeypatch.setattr(TaggedLog, 'find_batch', spy)
+
+    def run(capsys):
+        Analyse.standalone()
+        return starts.pop(), capsys.readouterr().out
+    return run
+
+
+def _write(path, *lines):
+    with path.open('a', encoding='utf-8') as log:
+        log.write(''.join(f"{line}\n" for line in lines))
+
+
+def _line(days_ago, text):
+    """A line from days ago, in the log format; errors are only reported if they
+    are newer than the last mail."""
+    date = datetime.datetime.now() - datetime.timedelta(days=days_ago)
+    return f"{date:%Y-%m-%dT%H:%M:%S} {text}"
+
+
+# the date of the last success, as in the mail:
+OLD = f"{datetime.datetime.now() - datetime.timedelta(days=30):%Y.%m.%d}"
+
+
+def test_resume(analyse, status_file, capsys):
+    _write(status_file, _line(31, "START first"), _line(30, "SUCCESS first"),
+           _line(0, "START second"), _line(0, "FAIL first failure"))
+    end = status_file.stat().st_size
+    start, mail = analyse(capsys)
+    assert start == 0
+    assert 'first failure' in mail
+    assert OLD in mail
+    _write(status_file, _line(0, "START third"), _line(0, "FAIL again"))
+    start, mail = analyse(capsys)
+    assert start == end
+    assert 'again' in mail and 'first failure' not in mail
+    # the success is taken from the checkpoint:
+    assert OLD in mail
+    assert 'noch nie' not in mail
+
+
+def test_rotated(analyse, status_file, capsys):
+    _write(status_file, _line(30, "SUCCESS first"), _line(0, "FAIL first"))
+    analyse(capsys)
+    Manifest(status_file).rotate()
+    _write(status_file, _line(0, "FAIL second"))
+    start, mail = analyse(capsys)
+    assert start == 0
+    assert 'second' in mail
+    assert OLD in mail
+
+
+def test_truncated(analyse, status_file, capsys):
+    _write(status_file, _line(30, "SUCCESS first"), _line(0, "FAIL first"))
+    analyse(capsys)
+    status_file.write_text(_line(0, "FAIL second\n"), encoding='utf-8')
+    start, mail = analyse(capsys)
+    assert start == 0
+    assert 'second' in mail and 'first' not in mail
@@ -0,0 +1,15 @@
+"""Both status log backends tell how many entries they have written."""
+
+import pytest
+
+from sayod.sqlitelog import SqliteLog
+from sayod.taggedentry import TaggedEntry
+from sayod.taggedlog import TaggedLog
+
+
+@pytest.mark.parametrize('backend,name', [(TaggedLog, 'status.log'), (SqliteLog, 'status.db')])
+def test_append_many_count(tmp_path, backend, name):
+    log = backend(str(tmp_path / name), 'a')
+    lines = ["2024-01-01T09:00:00 START a", "2024-01-01T09:00:05 SUCCESS b"]
+    assert log.append_many(TaggedEntry(line) for line in lines) == 2
+    assert log.append_many([]) == 0
@@ -0,0 +1,69 @@
+"""Queries with 'after' see the same entries whichever way they are answered."""
+
+import pytest
+
+from sayod.segments import Manifest
+from sayod.sqlitelog import SqliteLog
+from sayod.taggedentry import TaggedEntry
+from sayod.taggedlog import TaggedLog
+
+LINES = [
+    "2024-01-01T09:00:00 START old",
+    "2024-01-01T09:00:05 SUCCESS old",
+    "2024-01-01T09:00:05 ERROR after old success",
+    "2024-01-02T10:00:00 ERROR before new start",
+    "2024-01-02T10:00:07 START new",
+    "2024-01-02T10:00:07 ERROR same second",
+    "2024-01-02T10:00:07 SUCCESS new",
+    "2024-01-02T10:00:08 ERROR after new success",
+]
+
+QUERIES = {
+    'success': {'subject': 'SUCCESS', 'action': 'last'},
+    'start': {'subject': 'START', 'action': 'last', 'after': 'success'},
+    'errors': {'subject': 'ERROR', 'action': 'list', 'after': 'success'},
+    'count': {'subject': 'ERROR', 'action': 'count', 'after': 'success'},
+}
+
+
+@pytest.fixture(name='log', params=['text', 'index', 'sqlite'])
+def fixture_log(request, tmp_path):
+    log_file = tmp_path / 'status.log'
+    if request.param == 'sqlite':
+        log = SqliteLog(str(log_file), 'a')
+        log.append_many([TaggedEntry(line) for line in LINES])
+        return log
+    log_file.write_text(''.join(f"{line}\n" for line in LINES), encoding='utf-8')
+    return TaggedLog(str(log_file), 'r', index=request.param == 'index')
+
+
+def test_same_second(log):
+    found = log.find_batch(QUERIES)
+    assert found['success'][0].content == 'new'
+    # written before the SUCCESS, but in the same second:
+    assert found['start'][0].content == 'new'
+    assert [e.content for e in found['errors']] == ['same second', 'after new success']
+    assert found['count'] == [2]
+
+
+def test_nothing_to_follow(log):
+    found = log.find_batch({
+        'abort': {'subject': 'ABORT', 'action': 'last'},
+        'start': {'subject': 'START', 'action': 'last', 'after': 'abort'},
+    })
+    assert found['abort'] == [None]
+    assert found['start'][0].content == 'new'
+
+
+def test_segment_out_of_order(status_file):
+    status_file.write_text("2024-01-01T01:00:06 SUCCESS done\n"
+                           "2024-01-01T02:00:00 START next\n"
+                           "2023-12-29T03:00:12 ANALYSE late\n", encoding='utf-8')
+    Manifest(status_file).rotate()
+    log = TaggedLog(str(status_file), 'r', archive=Manifest(status_file))
+    found = log.find_batch({
+        'success': {'subject': 'SUCCESS', 'action': 'last'},
+        'since': {'action': 'list', 'after': 'success'},
+    })
+    since = log.find(since=found['success'][0].date)
+    assert [e.content for e in found['since']] == [e.content for e in since] == ['done', 'next']
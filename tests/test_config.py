@@ -0,0 +1,58 @@
+"""Configurations are read again when one of their files changes."""
+
+import os
+
+from sayod.config import Config, _Config
+
+
+def _touch(path, text):
+    """Writes text to path and makes sure that its mtime changes."""
+    before = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(text, encoding='utf-8')
+    os.utime(path, ns=(before + 10**9, before + 10**9))
+
+
+def test_reused_until_changed(job, tmp_path):
+    included = tmp_path / 'defaults.ini'
+    _touch(included, "[notify]\nhost = old\n")
+    config = job("[defaults]\ncommon = defaults.ini\n[info]\nfriendly_name = job\n")
+    first = Config.get()
+    assert first.find('notify', 'host', None) == 'old'
+    Config.init(configuration_file=str(config))
+    assert Config.get() is first
+    # a file that is included through [defaults]:
+    _touch(included, "[notify]\nhost = new\n")
+    Config.init(configuration_file=str(config))
+    assert Config.get() is not first
+    assert Config.get().find('notify', 'host', None) == 'new'
+    # the file itself:
+    second = Config.get()
+    _touch(config, "[defaults]\ncommon = defaults.ini\n[notify]\nhost = own\n")
+    Config.init(configuration_file=str(config))
+    assert Config.get() is not second
+    assert Config.get().find('notify', 'host', None) == 'own'
+
+
+def test_new_variant(job, tmp_path):
+    config = job("[info]\nfriendly_name = job\n")
+    first = Config.get()
+    # job.rc is a variant of job.ini which did not exist before:
+    _touch(tmp_path / 'job.rc', "[notify]\nhost = variant\n")
+    Config.init(configuration_file=str(config))
+    assert Config.get() is not first
+    assert Config.get().find('notify', 'host', None) == 'variant'
+
+
+def test_environment(job, monkeypatch):
+    config = job("[status]\nfile = ${env:LOGDIR}/status.log\n")
+    monkeypatch.setenv('LOGDIR', '/one')
+    Config.init(configuration_file=str(config))
+    assert Config.get().find('status', 'file', None) == '/one/status.log'
+    assert Config.get() is _Config.load(config, {**os.environ})
+    assert _Config.load(config, {'LOGDIR': '/two'}).find('status', 'file', None) \
+        == '/two/status.log'
+
+
+def test_no_copy_on_disk(job, tmp_path):
+    job("[mail]\npassword = secret\n")
+    assert not (tmp_path / 'cache' / 'sayod' / 'config').exists()
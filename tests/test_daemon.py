@@ -0,0 +1,78 @@
+"""The daemon must not wait for one client while others are waiting."""
+
+import json
+import socket
+import threading
+
+import pytest
+
+from sayod import daemon
+from sayod.daemonclient import TRAILER
+
+
+@pytest.fixture(name='server')
+def fixture_server(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon._Handler, 'timeout', 1)
+    path = str(tmp_path / 'sayod.sock')
+    server = daemon._Server(path, daemon._Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(5)
+    sock.connect(path)
+    return sock
+
+
+def _answer(sock):
+    with sock, sock.makefile('rb') as answer:
+        return answer.read()
+
+
+def test_idle_client(server, job, status_file):
+    log_file = status_file
+    config = job(f"[status]\nfile = {log_file}\n", init=False)
+    idle = _connect(server)
+    idle.sendall(b"receiver\n")
+    busy = _connect(server)
+    busy.sendall(f"receiver\ncontent-type: text/x-plain-log\n{config}\nSUCCESS\ndone\n"
+                 .encode('utf-8'))
+    busy.shutdown(socket.SHUT_WR)
+    assert _answer(busy) == TRAILER + b"0 \n"
+    assert log_file.read_text(encoding='utf-8').endswith(' SUCCESS done\n')
+    assert _answer(idle).startswith(TRAILER + b"1 ")
+
+
+def test_environment(server, job, tmp_path):
+    # the daemon does not have LOGDIR in its environment, the client has:
+    config = job("[status]\nfile = ${env:LOGDIR}/status.log\n", init=False)
+    client = _connect(server)
+    client.sendall(f"receiver\nenv {json.dumps({'LOGDIR': str(tmp_path)})}\n{config}\nSUCCESS\n"
+                   .encode('utf-8'))
+    client.shutdown(socket.SHUT_WR)
+    assert _answer(client) == TRAILER + b"0 \n"
+    assert (tmp_path / 'status.log').read_text(encoding='utf-8').endswith(' SUCCESS \n')
+
+
+def test_streaming(server, job, monkeypatch):
+    config = job("[status]\nfile = status.log\n", init=False)
+    received = threading.Event()
+
+    def serve(stdin, stdout, content_type):
+        stdout.write('x' * 100000 + '\n')
+        # the client gets the start of the answer before it is complete:
+        assert received.wait(5)
+    monkeypatch.setattr(daemon.LogReader, 'serve', serve)
+    client = _connect(server)
+    client.sendall(f"logreader\n{config}\n".encode('utf-8'))
+    client.shutdown(socket.SHUT_WR)
+    with client, client.makefile('rb') as answer:
+        assert answer.read(1000) == b'x' * 1000
+        received.set()
+        assert answer.read().endswith(b'x\n' + TRAILER + b"0 \n")
@@ -0,0 +1,111 @@
+"""The deadtime check asks the remote log everything in one session."""
+
+import datetime
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from sayod import context
+from sayod.notify import Notify
+from sayod.plain_log import PlainLog
+from sayod.remotereader import BatchUnsupported
+from sayod.successcache import SuccessCache
+from sayod.taggedentry import TaggedEntry
+
+
+def _job(job, monkeypatch, ask):
+    job(f"[rsync]\ndeadtime = 3\ndeadtime_cache = 0\n[notify]\nask = {ask}\n")
+    monkeypatch.setattr(Notify, '_instance', SimpleNamespace(ssh={'pipe': ''}, outbox=False))
+
+
+def _success(days):
+    entry = TaggedEntry('done', 'SUCCESS')
+    entry.date = datetime.datetime.today().replace(microsecond=0) - datetime.timedelta(days=days)
+    return entry
+
+
+def test_plain_is_default(job):
+    job("[rsync]\ndeadtime = 3\n")
+    assert not context.use_batch()
+
+
+def test_one_batch(job, monkeypatch):
+    _job(job, monkeypatch, 'batch')
+    calls = []
+
+    def remote_batch(queries):
+        calls.append(queries)
+        return {'success': [_success(5)], 'start': [], 'deadtime': [2]}
+
+    monkeypatch.setattr(context, 'remote_batch', remote_batch)
+    monkeypatch.setattr(context, 'remote', pytest.fail)
+    assert context.Context.test_deadtime()
+    assert len(calls) == 1
+    assert calls[0]['success'] == {'subjects': ['SUCCESS'], 'action': PlainLog.LAST}
+    assert calls[0]['start']['after'] == 'success'
+    assert calls[0]['deadtime']['action'] == PlainLog.COUNT
+
+
+def test_fallback_to_plain(job, monkeypatch):
+    _job(job, monkeypatch, 'batch')
+
+    def remote_batch(queries):
+        raise BatchUnsupported("Host does not answer batches")
+
+    monkeypatch.setattr(context, 'remote_batch', remote_batch)
+    monkeypatch.setattr(context, 'remote', lambda subjects, action: _success(5))
+    assert context.Context.test_deadtime()
+
+
+def _cache(job, ttl, stored_ago):
+    """Configures a cache with ttl seconds and stores a success of one day ago in
+    it, stored_ago seconds ago."""
+    job(f"[rsync]\ndeadtime = 3\ndeadtime_cache = {ttl}\n[notify]\nask = batch\n")
+    success = _success(1).date
+    SuccessCache.path().parent.mkdir(parents=True)
+    stored = datetime.datetime.now() - datetime.timedelta(seconds=stored_ago)
+    SuccessCache.path().write_text(json.dumps({
+        'success': f"{success:{TaggedEntry.timeformat}}",
+        'stored': f"{stored:{TaggedEntry.timeformat}}"}), encoding='utf-8')
+    return success
+
+
+@pytest.mark.parametrize('ttl, stored_ago, cached', [
+    (3600, 600, True),
+    (3600, 7200, False),
+    # stored in the future, e.g. after the clock has been set back:
+    (3600, -600, False),
+    (0, 0, False),
+])
+def test_cache_ttl(job, ttl, stored_ago, cached):
+    success = _cache(job, ttl, stored_ago)
+    assert SuccessCache.load() == (success if cached else None)
+
+
+def test_store(job):
+    job("[rsync]\ndeadtime_cache = 60\n")
+    success = _success(2).date
+    SuccessCache.store(success)
+    assert SuccessCache.load() == success
+    assert not list(SuccessCache.path().parent.glob('*.tmp'))
+
+
+@pytest.mark.parametrize('stored_ago', [600, 7200])
+def test_deadtime_from_cache(job, monkeypatch, stored_ago):
+    cached = _cache(job, 3600, stored_ago)
+    remote = _success(2)
+    told = []
+    monkeypatch.setattr(Notify, '_instance', SimpleNamespace(
+        ssh={'pipe': ''}, outbox=False, deadtime=told.append))
+    asked = []
+
+    def remote_batch(queries):
+        asked.append(queries)
+        return {'success': [remote], 'start': [], 'deadtime': [0]}
+    monkeypatch.setattr(context, 'remote_batch', remote_batch)
+    assert not context.Context.test_deadtime()
+    assert len(told) == 1
+    # only an expired cache makes it ask the remote log, which is cached then:
+    assert len(asked) == (stored_ago > 3600)
+    assert SuccessCache.load() == (remote.date if asked else cached)
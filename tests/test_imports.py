@@ -0,0 +1,26 @@
+"""Every subcommand must be importable on its own."""
+
+import importlib
+
+import pytest
+
+from sayod.arguments import Arguments
+
+
+@pytest.mark.parametrize('module', ['sayod.analyse', 'sayod.mailer'])
+def test_import(module):
+    importlib.import_module(module)
+
+
+@pytest.mark.parametrize('name', sorted(Arguments._commands))  # pylint: disable=protected-access
+def test_subcommand_class(name):
+    assert Arguments.klass(name) is not None
+
+
+@pytest.mark.parametrize('name', sorted(Arguments._commands))  # pylint: disable=protected-access
+def test_subcommand_help(name, capsys):
+    parser = Arguments._parser(name)  # pylint: disable=protected-access
+    with pytest.raises(SystemExit):
+        parser.parse_args(['--help'])
+    helptext = Arguments._commands[name][2]  # pylint: disable=protected-access
+    assert ' '.join(helptext.split()) in ' '.join(capsys.readouterr().out.split())
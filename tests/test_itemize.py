@@ -0,0 +1,94 @@
+"""Counting what rsync has done from its --itemize-changes and --stats
+output."""
+
+import os
+
+import pytest
+
+from sayod.itemize import ItemizeStats, parse_item, parse_number, unescape
+
+# rsync -a --delete --itemize-changes --stats, with and without -h:
+OUTPUT = r"""*deleting   gone
+.d..t...... ./
+>f.st...... old
+.f...p..... keep
+.f          same
+cd+++++++++ dir/
+>f+++++++++ dir/new
+>f+++++++++ dir/sp ace
+>f+++++++++ dir/\#303\#244
+cL+++++++++ link -> old
+hf+++++++++ hard => dir/new
+.L..t...... other -> keep
+
+Number of files: 9 (reg: 6, dir: 2, link: 2)
+Number of created files: 6 (reg: 4, dir: 1, link: 1)
+Number of deleted files: 1 (reg: 1)
+Number of regular files transferred: 4
+Total file size: {total} bytes
+Total transferred file size: {transferred} bytes
+Literal data: 18 bytes
+Matched data: 0 bytes
+File list size: 0
+File list generation time: 0.001 seconds
+File list transfer time: 0.000 seconds
+Total bytes sent: {sent}
+Total bytes received: 98
+
+sent {sent} bytes  received 98 bytes  2.47M bytes/sec
+total size is {total}  speedup is 0.00
+"""
+
+
+@pytest.mark.parametrize('numbers, expected', [
+    ({'total': '1,234', 'transferred': '18', 'sent': '1,234,567'}, (1234, 18, 1234567)),
+    ({'total': '1.23K', 'transferred': '18', 'sent': '1.23M'}, (1230, 18, 1230000)),
+])
+def test_output(numbers, expected):
+    stats = ItemizeStats()
+    kinds = {}
+    for line in OUTPUT.format(**numbers).splitlines():
+        kind, path = stats.add(line)
+        if kind is not None:
+            kinds.setdefault(kind, []).append(unescape(path))
+    assert kinds == {'deleted': ['gone'],
+                     'metadata': ['./', 'keep', 'other'],
+                     'updated': ['old'],
+                     'created': ['dir/', 'dir/new', 'dir/sp ace', 'dir/ä', 'link', 'hard'],
+                     }
+    assert stats.counts == {'created': 6, 'updated': 1, 'deleted': 1, 'metadata': 3}
+    assert (stats.bytes['total'], stats.bytes['transferred'], stats.bytes['sent']) == expected
+    assert stats.bytes['received'] == 98
+
+
+def test_not_itemized():
+    assert parse_item('.f          same') == (None, 'same')
+    assert parse_item('sent 1.23M bytes  received 98 bytes  2.47M bytes/sec') == (None, None)
+    assert parse_item('*message text') == (None, None)
+
+
+def test_unescape():
+    assert unescape(r'dir/\#303\#244 x') == 'dir/ä x'
+    # not UTF-8:
+    assert os.fsencode(unescape(r'dir/\#377')) == b'dir/\xff'
+
+
+@pytest.mark.parametrize('text, value', [
+    ('98', 98), ('1,234,567', 1234567), ('1.234.567', 1234567), ('1.23K', 1230),
+    ('1,23K', 1230), ('2.5G', 2500000000), ('0.50M', 500000),
+])
+def test_number(text, value):
+    assert parse_number(text) == value
+
+
+def test_merge():
+    first, second = ItemizeStats(), ItemizeStats()
+    for line in ('>f+++++++++ a', 'Total transferred file size: 1,000 bytes'):
+        first.add(line)
+    for line in ('>f.st...... b', '*deleting   c', 'Total transferred file size: 500 bytes'):
+        second.add(line)
+    first.seconds, second.seconds = 2.0, 3.0
+    first.merge(second)
+    assert first.counts == {'created': 1, 'updated': 1, 'deleted': 1, 'metadata': 0}
+    assert first.throughput == 500
+    assert str(first) == 'created=1 updated=1 deleted=1 metadata=0 transferred=1500 seconds=3.0'
@@ -0,0 +1,28 @@
+"""Setting up logging."""
+
+import logging
+import sys
+
+import pytest
+
+from sayod.log import Log, root_log
+
+
+@pytest.fixture(name='fresh_log')
+def fixture_fresh_log(monkeypatch):
+    monkeypatch.setattr(Log, '_root_ready', False)
+    monkeypatch.setattr(Log, '_journal', None)
+    monkeypatch.setattr(Log, '_listener', None)
+    handlers = list(root_log.handlers)
+    yield
+    Log.close()
+    root_log.handlers = handlers
+
+
+def test_failed_setup_is_repeated(fresh_log, monkeypatch):
+    with monkeypatch.context() as missing:
+        missing.setitem(sys.modules, 'systemd.journal', None)
+        with pytest.raises(ImportError):
+            Log.init_root()
+    Log.init(log_level=logging.ERROR)
+    assert Log._journal is not None  # pylint: disable=protected-access
@@ -0,0 +1,113 @@
+"""Saving the offset index of a status log."""
+
+import pytest
+
+from sayod.logindex import LogIndex
+
+
+def _append(log_file, *subjects):
+    with log_file.open('a', encoding='utf-8') as log:
+        for subject in subjects:
+            log.write(f"2024-01-01T00:00:00 {subject} text\n")
+
+
+def _update(index, log_file):
+    with log_file.open('rb') as raw:
+        index.update(raw)
+
+
+def _offsets(index, *subjects, **kwargs):
+    return list(index.offsets(subjects, **kwargs))
+
+
+def test_save_appends(status_file):
+    _append(status_file, 'START', 'SUCCESS')
+    index = LogIndex(status_file)
+    _update(index, status_file)
+    saved = index.path.read_bytes()
+    _append(status_file, 'START')
+    _update(index, status_file)
+    contents = index.path.read_bytes()
+    assert contents[LogIndex.header.size:].startswith(saved[LogIndex.header.size:])
+    assert len(contents) == LogIndex.header.size + 3 * LogIndex.record.size
+    assert index.names.read_text(encoding='utf-8') == "START\nSUCCESS\n"
+    loaded = LogIndex(status_file)
+    _update(loaded, status_file)
+    assert _offsets(loaded, 'START') == _offsets(index, 'START') == [0, 64]
+    assert _offsets(loaded, exclude=('START',)) == [31]
+    assert loaded.size == status_file.stat().st_size
+
+
+def test_load_reads_header(status_file, monkeypatch):
+    _append(status_file, *['START'] * 100)
+    _update(LogIndex(status_file), status_file)
+
+    def fail(*_):
+        raise AssertionError("line read again")
+    monkeypatch.setattr(LogIndex, 'add', fail)
+    index = LogIndex(status_file)
+    _update(index, status_file)
+    assert index.count == 100
+
+
+def test_concurrent_saves(status_file):
+    _append(status_file, 'START')
+    _update(LogIndex(status_file), status_file)
+    first, second = LogIndex(status_file), LogIndex(status_file)
+    _update(first, status_file)
+    _update(second, status_file)
+    _append(status_file, 'SUCCESS')
+    _update(first, status_file)
+    _append(status_file, 'START')
+    # second has not seen what first has saved:
+    _update(second, status_file)
+    loaded = LogIndex(status_file)
+    _update(loaded, status_file)
+    assert loaded.count == 3
+    assert _offsets(loaded, 'START', 'SUCCESS') == [0, 31, 64]
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_span(status_file, monkeypatch, reverse):
+    monkeypatch.setattr(LogIndex, 'block', 4)
+    _append(status_file, *['START', 'SUCCESS', 'FAIL'] * 10)
+    index = LogIndex(status_file)
+    _update(index, status_file)
+    # the three lines take 94 bytes:
+    found = _offsets(index, 'START', span=(1, 94 * 8), reverse=reverse)
+    expected = [94 * n for n in range(1, 8)]
+    assert found == (expected[::-1] if reverse else expected)
+    assert index.offsets((), ()) is None
+
+
+def test_rebuild(status_file):
+    _append(status_file, 'START', 'SUCCESS')
+    _update(LogIndex(status_file), status_file)
+    status_file.write_text("2024-01-01T00:00:00 FAIL text\n", encoding='utf-8')
+    index = LogIndex(status_file)
+    _update(index, status_file)
+    assert index.count == 1
+    assert _offsets(index, 'FAIL') == [0]
+    assert not _offsets(index, 'START')
+
+
+def test_old_format(status_file):
+    _append(status_file, 'START')
+    index = LogIndex(status_file)
+    index.path.write_text('{"inode": 1, "size": 0}', encoding='utf-8')
+    _update(LogIndex(status_file), status_file)
+    index = LogIndex(status_file)
+    _update(index, status_file)
+    assert _offsets(index, 'START') == [0]
+
+
+def test_read_only(status_file, monkeypatch):
+    _append(status_file, 'START')
+    index = LogIndex(status_file)
+
+    def refuse(*_):
+        raise PermissionError("read-only")
+    monkeypatch.setattr(LogIndex, '_lock', refuse)
+    _update(index, status_file)
+    assert index.size == status_file.stat().st_size
+    assert index.offsets(('START',)) is None
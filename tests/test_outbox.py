@@ -0,0 +1,43 @@
+"""Entries that could not be sent stay in the outbox until they are sent."""
+
+import pytest
+
+from sayod.notify import _Notify
+from sayod.outbox import Outbox
+from sayod.taggedentry import TaggedEntry
+
+
+@pytest.fixture(name='notify')
+def fixture_notify(job, tmp_path, monkeypatch):
+    job("[notify]\noutbox = yes\n")
+    notify = _Notify.__new__(_Notify)
+    notify.outbox = Outbox(tmp_path / 'outbox')
+    notify.sent = []
+    notify.fail = False
+
+    def send(content_type, lines):
+        if notify.fail:
+            return "receiver failed"
+        notify.sent.append((content_type, list(lines)))
+        return None
+    monkeypatch.setattr(notify, '_send', send)
+    monkeypatch.setattr(notify, 'notify_local', lambda *args, **kwargs: None)
+    return notify
+
+
+def test_single_entry_is_plain(notify):
+    assert notify.flush_outbox(TaggedEntry('done', 'SUCCESS'))
+    assert notify.sent == [('text/x-plain-log', ['SUCCESS\n', 'done'])]
+    assert not notify.outbox
+
+
+def test_kept_entries_are_sent_later(notify):
+    notify.fail = True
+    assert not notify.flush_outbox(TaggedEntry('begin', 'START'))
+    assert notify.outbox
+    notify.fail = False
+    assert notify.flush_outbox(TaggedEntry('done', 'SUCCESS'))
+    content_type, lines = notify.sent[0]
+    assert content_type == 'text/x-plain-log-batch'
+    assert [TaggedEntry(line).subject for line in lines] == ['START', 'SUCCESS']
+    assert not notify.outbox
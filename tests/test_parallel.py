@@ -0,0 +1,82 @@
+"""Splitting an rsync of a source into shards."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from sayod.rsync import ParallelRSync, RSync
+
+
+@pytest.fixture(name='source')
+def fixture_source(job, tmp_path):
+    job("[rsync]\noptions = --delete --exclude=/home/file\n")
+    home = tmp_path / 'src' / 'home'
+    for name in ('alice', 'bob', 'carol'):
+        (home / name).mkdir(parents=True)
+    (home / 'file').write_text('', encoding='utf-8')
+    return home
+
+
+def _run(monkeypatch, sources):
+    """Runs ParallelRSync with 2 workers and shards and returns its units."""
+    units = []
+
+    def run_one(_, unit, outfile, changes):
+        units.append(unit)
+        rsync = RSync()
+        rsync.returncode = 0
+        return rsync, 0.0
+
+    monkeypatch.setattr(ParallelRSync, '_run_one', run_one)
+    ParallelRSync(2, 2).run(sources, '/backup')
+    return units
+
+
+def _transferred(unit):
+    """The paths which rsync transfers for unit, relative to the root of the
+    transfer; anchored filter rules are matched against these."""
+    if '--relative' in unit.options:
+        return [path.split('/./', 1)[1] for path in unit.paths]
+    return ['' if path.endswith('/') else path.rsplit('/', 1)[-1] for path in unit.paths]
+
+
+def test_shard_directory_contents(source, monkeypatch):
+    units = _run(monkeypatch, [f"{source}/"])
+    assert len(units) == 3
+    assert sorted(p for unit in units[:2] for p in _transferred(unit)) == ['alice', 'bob', 'carol']
+    assert _transferred(units[2]) == ['']
+    assert units[2].paths == [f"{source}/./"]
+    assert all(unit.target == '/backup' for unit in units)
+
+
+def test_separate():
+    assert ParallelRSync.separate(['/home/'])
+    assert ParallelRSync.separate(['/home', '/srv'])
+    assert not ParallelRSync.separate(['/home/', '/srv'])
+    assert not ParallelRSync.separate(['/home', '/backup/home'])
+
+
+def test_anchored_exclude(source, monkeypatch):
+    units = _run(monkeypatch, [str(source)])
+    transferred = [p for unit in units for p in _transferred(unit)]
+    # the same root as 'rsync .../home /backup', where /home/file is home/file:
+    assert sorted(transferred) == ['home/', 'home/alice', 'home/bob', 'home/carol']
+    assert units[2].options == ['--relative', '--no-recursive', '--dirs']
+    assert all(unit.target == '/backup' for unit in units)
+
+
+def test_other_file_system(source, job, monkeypatch):
+    job("[rsync]\nno_cross = -x\n")
+    (source / 'proc').mkdir()
+    lstat = os.lstat
+
+    def mounted(path, *args, **kwargs):
+        if str(path) == f"{source}/proc":
+            return SimpleNamespace(st_dev=lstat(source).st_dev + 1)
+        return lstat(path, *args, **kwargs)
+    monkeypatch.setattr(os, 'lstat', mounted)
+    units = _run(monkeypatch, [f"{source}/"])
+    # one rsync with --one-file-system would only create proc, like the top level does:
+    assert sorted(p for unit in units[:2] for p in _transferred(unit)) == ['alice', 'bob', 'carol']
+    assert units[2].paths == [f"{source}/./"]
@@ -0,0 +1,30 @@
+"""The receiver must tell the sender whether the entries have been written."""
+
+import io
+
+import pytest
+
+from sayod.receiver import receiver
+
+
+@pytest.fixture(name='receiving')
+def fixture_receiving(job, status_file):
+    return job(f"[status]\nfile = {status_file}\n", init=False), status_file
+
+
+def test_receiver_writes(receiving, monkeypatch):
+    config, log_file = receiving
+    monkeypatch.setattr('sys.stdin', io.StringIO(
+        f"content-type: text/x-plain-log\n{config}\nSUCCESS\nall done\n"))
+    receiver()
+    assert log_file.read_text(encoding='utf-8').endswith(' SUCCESS all done\n')
+
+
+def test_receiver_fails(receiving, monkeypatch):
+    config, log_file = receiving
+    monkeypatch.setattr('sys.stdin', io.StringIO(
+        f"content-type: text/x-unknown\n{config}\nSUCCESS\nall done\n"))
+    with pytest.raises(SystemExit) as exit_info:
+        receiver()
+    assert exit_info.value.code != 0
+    assert log_file.read_text(encoding='utf-8') == ''
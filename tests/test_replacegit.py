@@ -0,0 +1,76 @@
+"""replace-git only stages what copy has listed as changed."""
+
+import subprocess
+
+import pytest
+
+from sayod.replacegit import ReplaceGit
+
+
+class _Git:
+    """Runs git in cwd like gitversion.Git, without its output handling."""
+    def __init__(self, cwd):
+        self.cwd = cwd
+        self.returncode = None
+
+    def command(self, *args):
+        self.returncode = subprocess.run(['git', *args], cwd=self.cwd, check=False,
+                                         capture_output=True).returncode
+
+    def staged(self):
+        return subprocess.run(['git', 'diff', '--cached', '--name-only', '-z'], cwd=self.cwd,
+                              check=True, capture_output=True, text=True).stdout.split('\0')[:-1]
+
+
+@pytest.fixture(name='target')
+def fixture_target(tmp_path):
+    target = tmp_path / 'target'
+    target.mkdir()
+    git = _Git(target)
+    git.command('init', '-q')
+    for name in ('changed', 'other', 'gone', '*'):
+        (target / name).write_text('old', encoding='utf-8')
+    git.command('add', '.')
+    git.command('-c', 'user.name=test', '-c', 'user.email=test@localhost',
+                'commit', '-q', '-m', 'first')
+    (target / 'changed').write_text('new', encoding='utf-8')
+    (target / 'other').write_text('new', encoding='utf-8')
+    (target / 'gone').unlink()
+    (target / 'new file').write_text('new', encoding='utf-8')
+    return git
+
+
+def _configure(job, tmp_path, changes):
+    path = tmp_path / 'changes'
+    if changes is not None:
+        path.write_text(''.join(f"{name}\0" for name in changes), encoding='utf-8')
+    job(f"[rsync]\nchanges = {path}\n")
+    return path
+
+
+def test_listed(job, tmp_path, target):
+    # '*' would match every file if it was not taken literally:
+    changes = _configure(job, tmp_path, ['changed', 'gone', 'new file', '*'])
+    ReplaceGit.stage(target)
+    assert sorted(target.staged()) == ['changed', 'gone', 'new file']
+    assert not changes.exists()
+
+
+def test_empty(job, tmp_path, target):
+    changes = _configure(job, tmp_path, [])
+    ReplaceGit.stage(target)
+    assert not target.staged()
+    assert not changes.exists()
+
+
+def test_missing(job, tmp_path, target):
+    _configure(job, tmp_path, None)
+    ReplaceGit.stage(target)
+    assert sorted(target.staged()) == ['changed', 'gone', 'new file', 'other']
+
+
+def test_rejected(job, tmp_path, target):
+    changes = _configure(job, tmp_path, ['../outside'])
+    ReplaceGit.stage(target)
+    assert sorted(target.staged()) == ['changed', 'gone', 'new file', 'other']
+    assert not changes.exists()
@@ -0,0 +1,75 @@
+"""Reading the status log while and after it is rotated."""
+
+import fcntl
+import importlib
+import io
+
+import pytest
+
+from sayod.segments import Manifest
+from sayod.status import rotate_status, status_log
+from sayod.taggedentry import TaggedEntry
+
+
+@pytest.fixture(name='status_config')
+def fixture_status_config(job, status_file):
+    job(f"[status]\nfile = {status_file}\nrotate = 1\n")
+    return status_file
+
+
+def test_read_right_after_rotation(status_config):
+    status_log('a').append_many([TaggedEntry('first', 'START'), TaggedEntry('done', 'SUCCESS')])
+    rotate_status()
+    assert status_config.exists()
+    assert status_config.stat().st_size == 0
+    log = status_log('r')
+    assert [e.subject for e in log.find(action='list')] == ['START', 'SUCCESS']
+    assert log.find_one(action='last', subject='SUCCESS').content == 'done'
+
+
+def test_append_after_rotation(status_config):
+    writer = status_log('a')
+    writer.append(TaggedEntry('old', 'START'))
+    rotate_status()
+    writer.append(TaggedEntry('new', 'START'))
+    assert status_config.read_text(encoding='utf-8').endswith('START new\n')
+    contents = [e.content for e in status_log('r').find(action='list', subject='START')]
+    assert contents == ['old', 'new']
+
+
+def test_compress_while_locked(job, status_file, monkeypatch):
+    job(f"[status]\nfile = {status_file}\nrotate = 1\ncompress = yes\nkeep_plain = 0\n")
+    compress = Manifest.compress
+    locked = []
+
+    def check(manifest, keep_plain=1):
+        # the rotated file, which has been locked as the log:
+        segment = status_file.with_name(manifest.segments[-1]['file'])
+        with open(segment, 'a', encoding='utf-8') as log:
+            try:
+                fcntl.flock(log.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked.append(False)
+            except BlockingIOError:
+                locked.append(True)
+        compress(manifest, keep_plain)
+    monkeypatch.setattr(Manifest, 'compress', check)
+    for content in ('first', 'second'):
+        status_log('a').append(TaggedEntry(content, 'START'))
+        rotate_status()
+    assert locked == [True, True]
+    segments = Manifest(status_file).segments
+    assert [info['compressed'] for info in segments] == [True, True]
+    contents = [e.content for e in status_log('r').find(action='list', subject='START')]
+    assert contents == ['first', 'second']
+
+
+def test_receiver_ignores_failed_rotation(status_config, monkeypatch):
+    receiver_module = importlib.import_module('sayod.receiver')
+
+    def fail():
+        raise OSError("cannot rotate")
+    monkeypatch.setattr(receiver_module, 'rotate_status', fail)
+    config = status_config.with_name('job.ini')
+    monkeypatch.setattr('sys.stdin', io.StringIO(f"{config}\nSUCCESS\ndone\n"))
+    receiver_module.receiver()
+    assert status_config.read_text(encoding='utf-8').endswith(' SUCCESS done\n')
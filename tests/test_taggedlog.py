@@ -0,0 +1,110 @@
+"""Queries on a text status log: bisecting by date, reading backwards and
+reading rotated segments."""
+
+import datetime
+
+import pytest
+
+from sayod.segments import Manifest
+from sayod.taggedlog import TaggedLog
+
+
+def _write(path, *lines):
+    with path.open('a', encoding='utf-8') as log:
+        log.write(''.join(f"{line}\n" for line in lines))
+
+
+def _day(day, subject, content=''):
+    return f"2024-01-{day:02d}T12:00:00 {subject} {content or day}"
+
+
+def _since(day):
+    return datetime.datetime(2024, 1, day)
+
+
+@pytest.fixture(name='ordered')
+def fixture_ordered(status_file):
+    _write(status_file, *(_day(day, 'START' if day % 2 else 'SUCCESS') for day in range(1, 29)))
+    return TaggedLog(str(status_file), 'r')
+
+
+def test_bisect(ordered, monkeypatch):
+    bisected = []
+    bisect = TaggedLog._bisect  # pylint: disable=protected-access
+
+    def spy(self, date, lo=0, after=False):
+        bisected.append(date)
+        return bisect(self, date, lo, after)
+    monkeypatch.setattr(TaggedLog, '_bisect', spy)
+    found = ordered.find(subject='START', since=_since(20), until=_since(25))
+    assert [e.content for e in found] == ['21', '23']
+    assert bisected == [_since(20), _since(25)]
+    assert ordered.find_one(action='first', since=_since(28)).content == '28'
+
+
+def test_reverse(ordered):
+    assert ordered.find_one(action='last', subject='START').content == '27'
+    assert ordered.find_one(action='last', subject='START', until=_since(10)).content == '9'
+    assert ordered.find_one(action='last', subject='ABORT') is None
+    assert ordered.find(action='count', subject='SUCCESS', since=_since(15)) == [7]
+
+
+def test_out_of_order(status_file):
+    _write(status_file, _day(1, 'START'), _day(5, 'SUCCESS'), _day(2, 'ERROR', 'late'),
+           _day(6, 'START'))
+    log = TaggedLog(str(status_file), 'r')
+    # bisecting would miss the late line:
+    assert [e.content for e in log.find(since=_since(2), until=_since(3))] == ['late']
+    assert log.find_one(action='last', until=_since(3)).content == 'late'
+
+
+@pytest.mark.parametrize('index', [False, True])
+def test_late_entries(status_file, monkeypatch, index):
+    _write(status_file, *(_day(day, 'START') for day in range(1, 11)), _day(3, 'ERROR', 'late'),
+           *(_day(day, 'START') for day in range(11, 21)))
+    # a new process only knows what has been saved:
+    TaggedLog(str(status_file), 'r', index=index).find(since=_since(1))
+    log = TaggedLog(str(status_file), 'r', index=index)
+    bisected = []
+    bisect = TaggedLog._bisect  # pylint: disable=protected-access
+
+    def spy(self, date, lo=0, after=False):
+        bisected.append(lo)
+        return bisect(self, date, lo, after)
+    monkeypatch.setattr(TaggedLog, '_bisect', spy)
+    # the lines before the late one are not read:
+    assert [e.content for e in log.find(since=_since(19))] == ['19', '20']
+    assert bisected == [status_file.read_text(encoding='utf-8').index(_day(11, 'START'))]
+    assert [e.content for e in log.find(since=_since(3), until=_since(4))] == ['3', 'late']
+    assert log.find_one(action='last', until=_since(10)).content == 'late'
+    assert log.find_one(action='first', since=_since(11)).content == '11'
+
+
+def test_segments(status_file):
+    _write(status_file, _day(1, 'START'), _day(2, 'SUCCESS'))
+    Manifest(status_file).rotate()
+    # this segment is out of order:
+    _write(status_file, _day(4, 'START'), _day(3, 'ERROR', 'late'), _day(5, 'SUCCESS'))
+    Manifest(status_file).rotate()
+    _write(status_file, _day(6, 'START'))
+    manifest = Manifest(status_file)
+    assert [info['ordered'] for info in manifest.segments] == [True, False]
+    log = TaggedLog(str(status_file), 'r', archive=manifest)
+    assert [e.content for e in log.find(since=_since(2), until=_since(4))] == ['2', 'late']
+    assert [e.content for e in log.find(subject='START')] == ['1', '4', '6']
+    assert log.find_one(action='last', subject='SUCCESS').content == '5'
+    assert log.find_one(action='last', until=_since(4)).content == 'late'
+    assert log.find(action='count', subject='ERROR') == [1]
+
+
+def test_indexed(status_file):
+    _write(status_file, *(_day(day, 'START' if day % 2 else 'SUCCESS') for day in range(1, 29)))
+    log = TaggedLog(str(status_file), 'a+', index=True)
+    assert log.find_one(action='last', subject='START').content == '27'
+    assert log.find_one(action='last', subject='START', until=_since(10)).content == '9'
+    assert log.find(action='count', subject='SUCCESS') == [14]
+    assert [e.content for e in log.find(subject='START', since=_since(20), until=_since(25))] \
+        == ['21', '23']
+    log.append_many(TaggedLog(str(status_file), 'r').find(subject='SUCCESS', since=_since(28)))
+    assert TaggedLog(str(status_file), 'r', index=True).find(
+        action='count', subject='SUCCESS') == [15]
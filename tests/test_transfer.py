@@ -0,0 +1,90 @@
+"""Choosing rsync's transfer options by the kind of target and by the send
+rates of earlier runs, which are kept per job."""
+
+import io
+
+import pytest
+
+from sayod import transfer
+from sayod.config import Config
+from sayod.itemize import ItemizeStats
+from sayod.jobstate import JobState
+from sayod.transfer import Transfer
+
+MOUNTS = r"""/dev/sda1 / ext4 rw,relatime 0 0
+server:/export /mnt/nfs nfs4 rw,relatime 0 0
+host:/home /mnt/ssh\040fs fuse.sshfs rw,nosuid,nodev 0 0
+/dev/sdb1 /mnt/nfs/disk ext4 rw 0 0
+"""
+
+
+@pytest.fixture(name='mounts')
+def fixture_mounts(monkeypatch):
+    real_open = open
+
+    def fake_open(path, *args, **kwargs):
+        if path == '/proc/mounts':
+            return io.StringIO(MOUNTS)
+        return real_open(path, *args, **kwargs)
+    monkeypatch.setattr(transfer, 'open', fake_open, raising=False)
+
+
+@pytest.mark.parametrize('target, kind', [
+    ('host:/backup', 'remote'),
+    ('user@host:backup', 'remote'),
+    ('rsync://host/module', 'remote'),
+    ('./dir:with:colons', 'local'),
+    ('/backup', 'local'),
+    ('/mnt/nfs/backup', 'network'),
+    # the innermost mount counts:
+    ('/mnt/nfs/disk/backup', 'local'),
+    ('/mnt/ssh fs/backup', 'fuse'),
+    ('/mnt/ssh fsx', 'local'),
+])
+@pytest.mark.usefixtures('mounts')
+def test_target_kind(target, kind):
+    assert transfer.target_kind(target) == kind
+
+
+def _stats(sent, seconds):
+    stats = ItemizeStats()
+    stats.bytes['sent'] = sent
+    stats.seconds = seconds
+    return stats
+
+
+@pytest.mark.usefixtures('mounts')
+def test_choose(job):
+    job("[rsync]\ncompress_below = 1.5M\n")
+    assert Transfer.choose('/mnt/nfs/backup') == ('network', ['--whole-file'])
+    # nothing is known about the network yet:
+    assert Transfer.choose('host:backup') == ('remote', ['--no-whole-file', '--compress'])
+    for rate in (1, 2, 3):
+        Transfer.remember('remote', _stats(rate * 20_000_000, 10))
+    assert Transfer.choose('host:backup') == ('remote', ['--no-whole-file', '--no-compress'])
+
+
+def test_remember(job):
+    job("[rsync]\ntransfer = auto\n")
+    Transfer.remember('local', _stats(100_000_000, 10))
+    # too little to say anything:
+    Transfer.remember('remote', _stats(1_000_000, 1))
+    assert not Transfer.rates()
+    for rate in range(1, 8):
+        Transfer.remember('remote', _stats(rate * 10_000_000, 10))
+    assert Transfer.rates() == [rate * 1_000_000 for rate in range(3, 8)]
+
+
+def test_job_state(job, tmp_path):
+    job("[rsync]\ntransfer = auto\n")
+    JobState.update('durations', {'a': 1})
+    JobState.update('send_rates', [5])
+    assert JobState.load() == {'durations': {'a': 1}, 'send_rates': [5]}
+    assert JobState.path() == tmp_path / 'state' / 'sayod' / 'jobs' / 'job.json'
+    # each job has a state of its own:
+    config = tmp_path / 'other.ini'
+    config.write_text("[rsync]\ntransfer = auto\n", encoding='utf-8')
+    Config.init(configuration_file=str(config))
+    assert JobState.get('send_rates', []) == []
+    JobState.path().parent.joinpath('other.json').write_text('{', encoding='utf-8')
+    assert JobState.load() == {}